@@ -0,0 +1,63 @@
+import os
+import struct
+import pygame
+
+# Cached images start with this header: magic, (mtime_ns, size) of the source file, then width and height.
+# The pixels follow as raw RGB bytes, which load without decoding or scaling anything.
+_HEADER = struct.Struct('<4sqqII')
+_MAGIC = b'CKI1'
+
+
+def load_image(path, size=None, cache_dir=None):
+    """
+    Load an image, scaled to size if given, converted to the pixel format of the display if one is open.
+    With a cache_dir, the scaled pixels are kept there the first time, and later loads read them back
+    instead of decoding and scaling the source again; the cache is rebuilt whenever the source changes.
+
+    :param size: (width, height) to scale the image to, or None to keep its own size.
+    :param cache_dir: a directory to cache the image in, created if missing, or None not to cache.
+    """
+    image = None
+    cache_path = None
+    if cache_dir is not None:
+        stat = os.stat(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        cache_path = os.path.join(cache_dir, '{}.{}.rgb'.format(name, '{}x{}'.format(*size) if size else 'full'))
+        image = _read_cached(cache_path, stat)
+    if image is None:
+        image = pygame.image.load(path)
+        if size is not None:
+            image = pygame.transform.scale(image, size)
+        if cache_path is not None:
+            _write_cached(cache_path, stat, image)
+    return image.convert() if pygame.display.get_surface() is not None else image
+
+
+def _read_cached(cache_path, stat):
+    """Get the image cached at cache_path if it was made from the source as it is now, else None."""
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, mtime_ns, source_size, width, height = _HEADER.unpack_from(data)
+    if (magic != _MAGIC or (mtime_ns, source_size) != (stat.st_mtime_ns, stat.st_size)
+            or len(data) != _HEADER.size + width * height * 3):
+        return None
+    return pygame.image.frombuffer(memoryview(data)[_HEADER.size:], (width, height), 'RGB')
+
+
+def _write_cached(cache_path, stat, image):
+    """Cache image at cache_path; failing to do so only costs the next load its speed."""
+    header = _HEADER.pack(_MAGIC, stat.st_mtime_ns, stat.st_size, image.get_width(), image.get_height())
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Write aside and rename, so that a launch reading the cache never sees half of it.
+        partial = cache_path + '.tmp'
+        with open(partial, 'wb') as f:
+            f.write(header + pygame.image.tobytes(image, 'RGB'))
+        os.replace(partial, cache_path)
+    except OSError:
+        pass
@@ -0,0 +1,268 @@
+from collections import namedtuple
+import numpy as np
+from .bitboard import BitBoard, DIRECTIONS, SQUARES, shift
+from .constants import WHITE, DARK_RED
+from .fen import parse_fen
+
+# Positions are held as uint32 bitboards, numbered as in checkers.bitboard.
+_DIRECTIONS = [(np.uint32(even_mask), even_shift, np.uint32(odd_mask), odd_shift)
+               for even_mask, even_shift, odd_mask, odd_shift in DIRECTIONS]
+# The opposite of every direction: left-up and right-down, right-up and left-down.
+_BACKS = _DIRECTIONS[::-1]
+
+# _STEPS[d, square] is the diagonal neighbour of square towards DIRECTIONS[d], or OFF if there is none.
+# OFF is one more square, off the board, whose bit is never set: two steps can be taken without checking the first.
+OFF = SQUARES
+
+
+def _neighbour(square, direction):
+    step = shift(1 << square, direction)
+    return step.bit_length() - 1 if step else OFF
+
+
+_STEPS = np.array([[_neighbour(square, direction) for square in range(SQUARES + 1)] for direction in DIRECTIONS],
+                  dtype=np.intp)
+_BITS = np.array([1 << square for square in range(SQUARES)] + [0], dtype=np.uint32)
+
+# Jumps are put in get_move_list order by a path key: the directions taken, as base-5 digits 1 to 4 from the
+# most significant one, padded with zeros. A chain then sorts right after the chain it extends and before the
+# chains branching off later, as the depth-first search of BitBoard.get_valid_moves finds them.
+# Only the pieces inside the border can be jumped, on 18 squares, so no chain is longer than that.
+MAX_CHAIN = 18
+_DIGITS = 5 ** np.arange(MAX_CHAIN - 1, -1, -1, dtype=np.int64)
+
+_START = BitBoard()
+
+
+def _shift(bits, direction):
+    """Vectorized checkers.bitboard.shift over an array of uint32 bitboards."""
+    even_mask, even_shift, odd_mask, odd_shift = direction
+    even = bits & even_mask
+    odd = bits & odd_mask
+    even = even << np.uint32(even_shift) if even_shift > 0 else even >> np.uint32(-even_shift)
+    odd = odd << np.uint32(odd_shift) if odd_shift > 0 else odd >> np.uint32(-odd_shift)
+    return even | odd
+
+
+# Masks of the steps of _spread, which moves bit i of a 16-bit value to bit 4 * i.
+_SPREAD = [(np.uint64(24), np.uint64(0x000000FF000000FF)), (np.uint64(12), np.uint64(0x000F000F000F000F)),
+           (np.uint64(6), np.uint64(0x0303030303030303)), (np.uint64(3), np.uint64(0x1111111111111111))]
+
+
+def _spread(bits):
+    bits = bits.astype(np.uint64)
+    for step, mask in _SPREAD:
+        bits = (bits | bits << step) & mask
+    return bits
+
+
+def _ranks(masks):
+    """
+    Find the squares set in one bitboard per direction, for every position.
+    :param masks: the bitboards of every position for each of the directions, in the order of DIRECTIONS.
+    :return: the rank (position * SQUARES + square) * len(DIRECTIONS) + direction of every set bit, ascending.
+    """
+    positions = np.flatnonzero(np.bitwise_or.reduce(masks))
+    # Interleave the bitboards of the positions found into 128 bits each, one direction after the other for
+    # every square: the bits then come out in ascending rank.
+    words = np.zeros((len(positions), 2), dtype='<u8')
+    for d, mask in enumerate(masks):
+        mask = mask[positions]
+        words[:, 0] |= _spread(mask & np.uint32(0xFFFF)) << np.uint64(d)
+        words[:, 1] |= _spread(mask >> np.uint32(16)) << np.uint64(d)
+    found = np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder='little').view(bool))
+    width = SQUARES * len(DIRECTIONS)
+    return positions[found // width] * width + found % width
+
+
+def _merge(rank, other_rank, arrays, other_arrays):
+    """Merge two lists of moves, each held as arrays and sorted by rank, with no rank in both lists."""
+    # A stable sort of two sorted runs merges them in one pass.
+    order = np.argsort(np.concatenate((rank, other_rank)), kind='stable')
+    return [np.concatenate((array, other))[order] for array, other in zip(arrays, other_arrays)]
+
+
+def _chains(rank, opponent, empty):
+    """
+    Follow the capture chains from their first jumps, one jump further at every level.
+    :param rank: the ranks of the first jumps, as from _ranks.
+    :return: the rank of the first jump, the end and the jumped pieces of every capture, in get_move_list order.
+    """
+    piece, direction = rank // len(DIRECTIONS), rank % len(DIRECTIONS)
+    board, square = piece // SQUARES, piece % SQUARES
+    target = _STEPS[direction, square]
+    end, captured = _STEPS[direction, target], _BITS[target]
+
+    # A longer chain is (index of its first jump, position, square reached, jumped squares, path key);
+    # the jumped pieces stay on the board until the move is made.
+    chains = (np.arange(len(rank)), board, end, captured, (direction + 1) * _DIGITS[0])
+    longer_chains = []
+    for level in range(1, MAX_CHAIN):
+        first, board, square, jumped, key = chains
+        capturable = opponent[board] & ~jumped
+        empty_of = empty[board]
+        longer = []
+        for d in range(len(DIRECTIONS)):
+            target = _STEPS[d, square]
+            landing = _STEPS[d, target]
+            found = np.flatnonzero(((capturable & _BITS[target]) != 0) & ((empty_of & _BITS[landing]) != 0))
+            longer.append((first[found], board[found], landing[found], jumped[found] | _BITS[target[found]],
+                           key[found] + (d + 1) * _DIGITS[level]))
+        chains = tuple(np.concatenate(arrays) for arrays in zip(*longer))
+        if not len(chains[0]):
+            break
+        longer_chains.append(chains)
+    if not longer_chains:
+        return rank, end, captured
+
+    # The moves of the pieces whose chains all stop after one jump are in order already.
+    # Those with longer chains are sorted by path key, and chains landing on the same square make one move,
+    # as in the dict of get_valid_moves: in the place of the first chain found and with the pieces of the last one.
+    first, _, chain_end, chain_captured, key = (np.concatenate(arrays) for arrays in zip(*longer_chains))
+    multiple = np.isin(piece, piece[first])
+    first = np.concatenate((np.flatnonzero(multiple), first))
+    chain_end = np.concatenate((end[multiple], chain_end))
+    chain_captured = np.concatenate((captured[multiple], chain_captured))
+    key = np.concatenate(((direction[multiple] + 1) * _DIGITS[0], key))
+    chain_piece = piece[first]
+    order = np.lexsort((key, chain_end, chain_piece))
+    chain_piece, chain_end, chain_captured, key = (array[order] for array in (chain_piece, chain_end,
+                                                                               chain_captured, key))
+    distinct = np.ones(len(order), dtype=bool)
+    distinct[1:] = (chain_piece[1:] != chain_piece[:-1]) | (chain_end[1:] != chain_end[:-1])
+    firsts = np.flatnonzero(distinct)
+    lasts = np.append(firsts[1:] - 1, len(order) - 1)
+    chain_piece, chain_end, chain_captured, key = (chain_piece[firsts], chain_end[firsts], chain_captured[lasts],
+                                                   key[firsts])
+    order = np.lexsort((key, chain_piece))
+    chain_piece, chain_end, chain_captured, key = (array[order] for array in (chain_piece, chain_end,
+                                                                               chain_captured, key))
+    chain_rank = chain_piece * len(DIRECTIONS) + key // _DIGITS[0] - 1
+
+    single = ~multiple
+    return _merge(rank[single], chain_rank, (rank[single], end[single], captured[single]),
+                  (chain_rank, chain_end, chain_captured))
+
+
+class BatchMoves(namedtuple('BatchMoves', ['offsets', 'board', 'start', 'end', 'captured'])):
+    """
+    The moves of every position of a BoardBatch, as flat arrays: those of position i are at
+    offsets[i]:offsets[i + 1], in the order get_move_list gives them. board is the position of every move,
+    start and end are squares (see checkers.bitboard), captured is a bitboard of the jumped pieces, 0 if none.
+    """
+    __slots__ = ()
+
+    @property
+    def counts(self):
+        """The number of moves of every position."""
+        return np.diff(self.offsets)
+
+    def random_choices(self, rng):
+        """
+        Pick a move of every position at random, as play takes them, with -1 for the positions without a move.
+        :param rng: a numpy.random.Generator.
+        """
+        counts = self.counts
+        return np.where(counts > 0, (rng.random(len(counts)) * counts).astype(np.intp), -1)
+
+
+class BoardBatch:
+    """
+    Many positions, each with its side to move, held as arrays of bitboards.
+    Moves are generated, played and checked for the end of the game for all of them at once with the rules
+    of BitBoard, so that thousands of games can be played side by side (self-play, datasets) without
+    paying Python's overhead for every position.
+    """
+
+    def __init__(self, white, red, turn):
+        """
+        :param white: the white bitboard of every position, see checkers.bitboard.
+        :param red: the red bitboard of every position.
+        :param turn: the color to move in every position.
+        """
+        self.white = np.array(white, dtype=np.uint32)
+        self.red = np.array(red, dtype=np.uint32)
+        self.turn = np.array(turn, dtype=np.uint8)
+        if not self.white.shape == self.red.shape == self.turn.shape or self.white.ndim != 1:
+            raise ValueError('white, red and turn must be sequences of the same length')
+
+    @classmethod
+    def start(cls, count):
+        """Build a batch of count games at the starting position, red to move as in Game."""
+        return cls(np.full(count, _START.white), np.full(count, _START.red), np.full(count, DARK_RED))
+
+    @classmethod
+    def from_fens(cls, fens):
+        """Build a batch holding the positions of FEN strings (see checkers.fen)."""
+        boards = [BitBoard.from_fen(fen) for fen in fens]
+        return cls([board.white for board in boards], [board.red for board in boards],
+                   [parse_fen(fen)[0] for fen in fens])
+
+    def __len__(self):
+        return len(self.turn)
+
+    def get_bitboard(self, i):
+        """Get position i as a BitBoard; its side to move is self.turn[i]."""
+        return BitBoard(int(self.white[i]), int(self.red[i]))
+
+    def reset(self, which):
+        """Put the starting position back on the positions selected by which, a boolean mask or indices."""
+        self.white[which] = _START.white
+        self.red[which] = _START.red
+        self.turn[which] = DARK_RED
+
+    def get_winners(self):
+        """Get the winner of every position as BitBoard.get_winner does, with -1 where there is none yet."""
+        winners = np.full(len(self), -1, dtype=np.int8)
+        winners[self.red == 0] = WHITE
+        winners[self.white == 0] = DARK_RED
+        return winners
+
+    def get_moves(self):
+        """Get the valid moves of the side to move in every position, as BatchMoves."""
+        white_to_move = self.turn == WHITE
+        own = np.where(white_to_move, self.white, self.red)
+        opponent = np.where(white_to_move, self.red, self.white)
+        empty = ~(own | opponent)
+
+        # The pieces that can step, or jump, towards every direction, as in BitBoard.movable.
+        # Ranking them by position, then square, then direction gives the quiet moves in get_move_list order;
+        # the jumps of a piece towards a direction take the place of its step that way.
+        rank = _ranks([_shift(empty, back) & own for back in _BACKS])
+        jump_rank = _ranks([_shift(_shift(empty, back) & opponent, back) & own for back in _BACKS])
+
+        piece, direction = rank // len(DIRECTIONS), rank % len(DIRECTIONS)
+        end = _STEPS[direction, piece % SQUARES]
+        captured = np.zeros(len(rank), dtype=np.uint32)
+        if len(jump_rank):
+            jump_rank, jump_end, jump_captured = _chains(jump_rank, opponent, empty)
+            piece, end, captured = _merge(rank, jump_rank, (piece, end, captured),
+                                          (jump_rank // len(DIRECTIONS), jump_end, jump_captured))
+
+        board = piece // SQUARES
+        offsets = np.zeros(len(self) + 1, dtype=np.intp)
+        np.cumsum(np.bincount(board, minlength=len(self)), out=offsets[1:])
+        return BatchMoves(offsets, board, piece % SQUARES, end, captured)
+
+    def play(self, moves, choices):
+        """
+        Play a move in every position and pass the turn.
+        :param moves: the BatchMoves of the positions, from get_moves.
+        :param choices: the index of the move to play among the moves of every position,
+            or -1 to leave a position as it is, e.g. a finished game.
+        """
+        choices = np.asarray(choices, dtype=np.intp)
+        counts = moves.counts
+        if choices.shape != counts.shape:
+            raise ValueError('Give one choice per position')
+        if np.any(choices >= counts):
+            raise ValueError('Choice out of the moves of its position')
+        playing = np.flatnonzero(choices >= 0)
+        index = moves.offsets[playing] + choices[playing]
+        moved = _BITS[moves.start[index]] | _BITS[moves.end[index]]
+        captured = moves.captured[index]
+        white_to_move = self.turn[playing] == WHITE
+        white, red = self.white[playing], self.red[playing]
+        self.white[playing] = np.where(white_to_move, white ^ moved, white & ~captured)
+        self.red[playing] = np.where(white_to_move, red & ~captured, red ^ moved)
+        self.turn[playing] = np.where(white_to_move, DARK_RED, WHITE)
@@ -0,0 +1,374 @@
+from .constants import WHITE, DARK_RED, ROWS, COLS
+from .piece import Piece
+from .zobrist import PIECE_KEYS, piece_key
+from .fen import parse_fen
+
+# Only the 32 dark squares are playable, so a position fits in a few 32-bit integers.
+# Squares are numbered row by row: square = row * 4 + col // 2.
+SQUARES = 32
+FULL = (1 << SQUARES) - 1
+
+# Playable squares of even rows are on odd columns and vice versa,
+# so the distance to a diagonal neighbour depends on the row parity.
+EVEN_ROWS = sum(0xF << (row * 4) for row in range(0, ROWS, 2))
+ODD_ROWS = FULL ^ EVEN_ROWS
+# Column 0 only exists on odd rows, column 7 only on even rows.
+LEFT_EDGE = sum(1 << (row * 4) for row in range(1, ROWS, 2))
+RIGHT_EDGE = sum(1 << (row * 4 + 3) for row in range(0, ROWS, 2))
+
+# Each direction is (even rows mask, even rows shift, odd rows mask, odd rows shift),
+# in the same order Board.get_valid_moves scans them: left-up, right-up, left-down, right-down.
+DIRECTIONS = (
+    (EVEN_ROWS, -4, ODD_ROWS & ~LEFT_EDGE, -5),
+    (EVEN_ROWS & ~RIGHT_EDGE, -3, ODD_ROWS, -4),
+    (EVEN_ROWS, 4, ODD_ROWS & ~LEFT_EDGE, 3),
+    (EVEN_ROWS & ~RIGHT_EDGE, 5, ODD_ROWS, 4),
+)
+
+
+def shift(bits, direction):
+    """Move every square in bits one step towards direction, dropping those that leave the board."""
+    even_mask, even_shift, odd_mask, odd_shift = direction
+    even = bits & even_mask
+    odd = bits & odd_mask
+    even = even << even_shift if even_shift > 0 else even >> -even_shift
+    odd = odd << odd_shift if odd_shift > 0 else odd >> -odd_shift
+    return (even | odd) & FULL
+
+
+def square_of(row, col):
+    """Get the square index of (row, col), or None if it is not a playable square."""
+    if 0 <= row < ROWS and 0 <= col < COLS and col % 2 == (row + 1) % 2:
+        return row * 4 + col // 2
+    return None
+
+
+def _square_bit(row, col):
+    square = square_of(row, col)
+    return 0 if square is None else 1 << square
+
+
+def row_col(square):
+    """Get the (row, col) of a square index."""
+    row = square >> 2
+    return row, (square & 3) * 2 + 1 - row % 2
+
+
+def iter_squares(bits):
+    """Yield the squares set in bits in ascending (row-major) order."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+# ROW_COLS[square] is row_col(square); STEPS[square] has (bit, (row, col)) of every diagonal neighbour
+# of square, in the order of DIRECTIONS.
+ROW_COLS = tuple(row_col(square) for square in range(SQUARES))
+STEPS = tuple(tuple((shift(1 << square, direction), ROW_COLS[shift(1 << square, direction).bit_length() - 1])
+                    for direction in DIRECTIONS if shift(1 << square, direction))
+              for square in range(SQUARES))
+
+
+def _rays(square):
+    """Get (bit, (row, col), bit beyond, square beyond or None) of every diagonal neighbour of square."""
+    rays = []
+    for direction in DIRECTIONS:
+        bit = shift(1 << square, direction)
+        if bit:
+            beyond = shift(bit, direction)
+            rays.append((bit, ROW_COLS[bit.bit_length() - 1], beyond, beyond.bit_length() - 1 if beyond else None))
+    return tuple(rays)
+
+
+# RAYS[square] is _rays(square), in the order of DIRECTIONS: where a piece on square steps to,
+# or what it jumps over and lands on.
+RAYS = tuple(_rays(square) for square in range(SQUARES))
+# SQUARE_BITS[row][col] is the bit of the square (row, col), 0 for the squares that cannot be played.
+SQUARE_BITS = tuple(tuple(_square_bit(row, col) for col in range(COLS)) for row in range(ROWS))
+
+
+class BitBoard:
+    """
+    Bitboard-backed equivalent of Board.
+    It follows the same rules and exposes the same operations that Game and the minimax use,
+    but holds no pygame objects, so it is cheap to copy, pickle and search.
+    """
+    __slots__ = ('white', 'red', 'white_left', 'black_left', 'hash')
+
+    def __init__(self, white=None, red=None):
+        """Initialize the BitBoard, by default with the starting layout of Board.create_board."""
+        if white is None:
+            white = (1 << 12) - 1
+        if red is None:
+            red = FULL ^ ((1 << 20) - 1)
+        self.white = white
+        self.red = red
+        self.white_left = bin(white).count('1')
+        self.black_left = bin(red).count('1')
+        # Zobrist hash of the pieces on the board, kept up to date by every change.
+        self.hash = 0
+        for square in iter_squares(white):
+            self.hash ^= piece_key(*row_col(square), WHITE)
+        for square in iter_squares(red):
+            self.hash ^= piece_key(*row_col(square), DARK_RED)
+
+    @classmethod
+    def from_board(cls, board):
+        """Build a BitBoard holding the same position as a Board."""
+        white = red = 0
+        for square in range(SQUARES):
+            piece = board.get_piece(*row_col(square))
+            if piece is not None:
+                if piece.color == WHITE:
+                    white |= 1 << square
+                else:
+                    red |= 1 << square
+        return cls(white, red)
+
+    @classmethod
+    def from_fen(cls, fen):
+        """Build a BitBoard holding the position of a FEN string (see checkers.fen)."""
+        turn, white, red = parse_fen(fen)
+        white_bits = red_bits = 0
+        for row, col in white:
+            white_bits |= 1 << square_of(row, col)
+        for row, col in red:
+            red_bits |= 1 << square_of(row, col)
+        return cls(white_bits, red_bits)
+
+    def copy(self):
+        new = BitBoard.__new__(BitBoard)
+        new.white = self.white
+        new.red = self.red
+        new.white_left = self.white_left
+        new.black_left = self.black_left
+        new.hash = self.hash
+        return new
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __eq__(self, other):
+        return isinstance(other, BitBoard) and self.white == other.white and self.red == other.red
+
+    def __hash__(self):
+        return self.hash
+
+    @property
+    def occupied(self):
+        return self.white | self.red
+
+    def evaluate(self):
+        """
+        Evaluate game value for minimax algorithm.
+        Here, white is likely to represent the AI.
+        """
+        return self.white_left - self.black_left
+
+    def get_winner(self):
+        """Get winner if any."""
+        if self.white_left <= 0:
+            return DARK_RED
+        elif self.black_left <= 0:
+            return WHITE
+        else:
+            return None
+
+    def get_piece(self, row, col):
+        square = square_of(row, col)
+        if square is None:
+            return None
+        bit = 1 << square
+        if self.white & bit:
+            return Piece(row, col, WHITE)
+        if self.red & bit:
+            return Piece(row, col, DARK_RED)
+        return None
+
+    def get_all_pieces(self, color):
+        """Get all the remaining pieces of a given color."""
+        bits = self.white if color == WHITE else self.red
+        return [Piece(*row_col(square), color) for square in iter_squares(bits)]
+
+    def move(self, piece, row, col):
+        """Move a Piece."""
+        if piece is not None:
+            origin = 1 << square_of(piece.row, piece.col)
+            target = 1 << square_of(row, col)
+            if piece.color == WHITE:
+                self.white = self.white & ~origin | target
+            else:
+                self.red = self.red & ~origin | target
+            self.hash ^= piece_key(piece.row, piece.col, piece.color) ^ piece_key(row, col, piece.color)
+            piece.move(row, col)
+
+    def play(self, start, end, skip, undo=False):
+        """
+        Make a move given by the fields of a Move, or revert it with undo: the piece on start goes to end,
+        and the pieces in skip are taken off. Only the masks are flipped; no Piece is looked up or created.
+        """
+        start_row, start_col = start
+        end_row, end_col = end
+        moved = SQUARE_BITS[start_row][start_col] | SQUARE_BITS[end_row][end_col]
+        if self.white & moved:
+            color, opponent_color = WHITE, DARK_RED
+            self.white ^= moved
+        else:
+            color, opponent_color = DARK_RED, WHITE
+            self.red ^= moved
+        self.hash ^= PIECE_KEYS[start_row][start_col][color] ^ PIECE_KEYS[end_row][end_col][color]
+        if skip:
+            captured = 0
+            for piece in skip:
+                captured |= SQUARE_BITS[piece.row][piece.col]
+                self.hash ^= PIECE_KEYS[piece.row][piece.col][opponent_color]
+            taken = -len(skip) if undo else len(skip)
+            if color == WHITE:
+                self.red ^= captured
+                self.black_left -= taken
+            else:
+                self.white ^= captured
+                self.white_left -= taken
+
+    def remove_pieces(self, pieces):
+        """Remove defeated pieces from board."""
+        for piece in pieces:
+            if piece is not None:
+                bit = 1 << square_of(piece.row, piece.col)
+                self.hash ^= piece_key(piece.row, piece.col, piece.color)
+                if piece.color == WHITE:
+                    self.white &= ~bit
+                    self.white_left -= 1
+                else:
+                    self.red &= ~bit
+                    self.black_left -= 1
+
+    def restore_pieces(self, pieces):
+        """Put pieces taken off by remove_pieces back on the board."""
+        for piece in pieces:
+            if piece is not None:
+                bit = 1 << square_of(piece.row, piece.col)
+                self.hash ^= piece_key(piece.row, piece.col, piece.color)
+                if piece.color == WHITE:
+                    self.white |= bit
+                    self.white_left += 1
+                else:
+                    self.red |= bit
+                    self.black_left += 1
+
+    def get_valid_moves(self, piece, quiet=True):
+        """
+        Get the valid moves of a piece, in the same format and order as Board.get_valid_moves:
+        (row, col) of the destination as keys, and the jumped pieces, or None, as values.
+        :param quiet: if False, leave out the moves that do not jump.
+        """
+        if piece.color == WHITE:
+            opponent, opponent_color = self.red, DARK_RED
+        else:
+            opponent, opponent_color = self.white, WHITE
+        empty = ~(self.white | self.red) & FULL
+        return self._moves_from(square_of(piece.row, piece.col), opponent, opponent_color, empty, quiet)
+
+    def _moves_from(self, square, opponent, opponent_color, empty, quiet):
+        """get_valid_moves of the piece on square, given the squares of its opponent and the empty squares."""
+        moves = {}
+        for bit, end, beyond, landing in RAYS[square]:
+            if bit & empty:
+                if quiet:
+                    moves[end] = None
+            elif bit & opponent and beyond & empty:
+                jumped = [Piece(*end, opponent_color)]
+                moves[ROW_COLS[landing]] = jumped
+                self._jump(landing, opponent, opponent_color, empty, jumped, bit, moves)
+        return moves
+
+    def _jump(self, square, opponent, opponent_color, empty, jumped, jumped_bits, moves):
+        """
+        Extend a capture chain from square.
+
+        :param opponent: squares occupied by the opponent.
+        :param empty: empty squares; the moving piece and the jumped pieces stay on the board during the chain.
+        :param jumped: pieces jumped over so far.
+        :param jumped_bits: squares of the jumped pieces, which cannot be jumped again.
+        :param moves: collects the valid moves.
+        """
+        capturable = opponent & ~jumped_bits
+        for bit, end, beyond, landing in RAYS[square]:
+            if bit & capturable and beyond & empty:
+                chain = jumped + [Piece(*end, opponent_color)]
+                moves[ROW_COLS[landing]] = chain
+                self._jump(landing, opponent, opponent_color, empty, chain, jumped_bits | bit, moves)
+
+    def get_moves(self, color):
+        """
+        Get the moves of all pieces of a given color as (start, end, jumped pieces or None), in get_move_list order.
+        Pieces are only created for the pieces that can jump, whose moves come from get_valid_moves.
+        """
+        if color == WHITE:
+            own, opponent, opponent_color = self.white, self.red, DARK_RED
+        else:
+            own, opponent, opponent_color = self.red, self.white, WHITE
+        empty = ~(own | opponent) & FULL
+        jumpers = 0
+        for back in DIRECTIONS[::-1]:
+            jumpers |= shift(shift(empty, back) & opponent, back) & own
+        moves = []
+        for square in iter_squares(own):
+            start = ROW_COLS[square]
+            if jumpers >> square & 1:
+                for end, skip in self._moves_from(square, opponent, opponent_color, empty, True).items():
+                    moves.append((start, end, skip))
+            else:
+                for bit, end in STEPS[square]:
+                    if bit & empty:
+                        moves.append((start, end, None))
+        return moves
+
+    def get_captures(self, color):
+        """
+        Get the jumps of all pieces of a given color as (start, end, jumped pieces),
+        in the order get_move_list would give them.
+        """
+        if color == WHITE:
+            own, opponent, opponent_color = self.white, self.red, DARK_RED
+        else:
+            own, opponent, opponent_color = self.red, self.white, WHITE
+        empty = ~(own | opponent) & FULL
+        # Only the pieces next to an opponent piece with an empty square behind it can jump.
+        jumpers = 0
+        for back in DIRECTIONS[::-1]:
+            jumpers |= shift(shift(empty, back) & opponent, back) & own
+        captures = []
+        for square in iter_squares(jumpers):
+            start = ROW_COLS[square]
+            for end, skip in self._moves_from(square, opponent, opponent_color, empty, False).items():
+                captures.append((start, end, skip))
+        return captures
+
+    def get_quiet_moves(self, color):
+        """Get the moves of all pieces of a given color that do not jump, as (start, end) in get_move_list order."""
+        own = self.white if color == WHITE else self.red
+        empty = ~(self.white | self.red) & FULL
+        moves = []
+        for square in iter_squares(own):
+            start = ROW_COLS[square]
+            for bit, end in STEPS[square]:
+                if bit & empty:
+                    moves.append((start, end))
+        return moves
+
+    def movable(self, color):
+        """Get the squares of the pieces of a given color that have at least one valid move."""
+        if color == WHITE:
+            own, opponent = self.white, self.red
+        else:
+            own, opponent = self.red, self.white
+        empty = ~(own | opponent) & FULL
+        movers = 0
+        for back in DIRECTIONS[::-1]:
+            # Quiet moves: step back from the empty squares onto our own pieces.
+            movers |= shift(empty, back) & own
+            # Captures: step back from the empty squares over an opponent piece onto our own pieces.
+            movers |= shift(shift(empty, back) & opponent, back) & own
+        return movers
@@ -1,7 +1,40 @@
-import pygame
-from .constants import WHITE, DARK_RED, DARK_GREEN, ROWS, COLS, SQUARE_SIZE
+from .constants import WHITE, DARK_RED, ROWS, COLS
 from .piece import Piece
-from copy import deepcopy
+from .zobrist import piece_key
+from .fen import parse_fen
+
+# Diagonal directions as (row step, col step), in the order get_valid_moves scans them.
+DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def _rays(row, col):
+    """
+    Get the diagonal geometry of (row, col): for every direction that stays on the board,
+    (row, col) of the neighbour, its row and col again, a bit standing for the neighbour's square,
+    and (row, col) of the square beyond it, or None if that is off the board.
+    """
+    rays = []
+    for row_step, col_step in DIRECTIONS:
+        n_row, n_col = row + row_step, col + col_step
+        if 0 <= n_row < ROWS and 0 <= n_col < COLS:
+            b_row, b_col = n_row + row_step, n_col + col_step
+            landing = (b_row, b_col) if 0 <= b_row < ROWS and 0 <= b_col < COLS else None
+            rays.append(((n_row, n_col), n_row, n_col, 1 << (n_row * COLS + n_col), landing))
+    return tuple(rays)
+
+
+# RAYS[row][col] holds the _rays of every square, computed once rather than at every move generation.
+RAYS = tuple(tuple(_rays(row, col) for col in range(COLS)) for row in range(ROWS))
+
+# REACH[row][col] has a bit for (row, col) and every square its rays look at: the neighbours and the squares beyond.
+# The moves found from a square can only change when one of these squares does.
+REACH = tuple(tuple(sum(bit | (1 << (landing[0] * COLS + landing[1]) if landing else bit)
+                        for square, n_row, n_col, bit, landing in RAYS[row][col]) | 1 << (row * COLS + col)
+                    for col in range(COLS)) for row in range(ROWS))
+
+
+# BITS[row][col] is the bit of (row, col) in the square masks above.
+BITS = tuple(tuple(1 << (row * COLS + col) for col in range(COLS)) for row in range(ROWS))
 
 
 class Board:
@@ -13,14 +46,38 @@ class Board:
         # The number of checkers left.
         self.black_left = self.white_left = 12
 
+        # Zobrist hash of the pieces on the board, kept up to date by every change.
+        self.hash = 0
+
+        # (row, col) of a piece -> (its valid moves, bitmask of the squares they depend on, whether they jump),
+        # filled by get_valid_moves. move, remove_pieces and restore_pieces note the squares they change, and
+        # the entries depending on them are dropped at the next lookup, so a move only costs recomputing the
+        # pieces around it. _touched has every square changed since the last lookup; _flipped only has the net
+        # change, red pieces on bits of their own, so a move made and unmade in between cancels out.
+        # Jumps hold the jumped pieces, which may have been swapped for others of the same color meanwhile,
+        # so they are dropped on any change.
+        self._moves = {}
+        self._touched = self._flipped = 0
+        self.move_hits = self.move_misses = 0
+
         self.create_board()
 
-    def draw_squares(self, win):
-        """Draw atomic squares of the Board."""
-        win.fill(DARK_GREEN)
-        for row in range(ROWS):
-            for col in range(row % 2, COLS, 2):
-                pygame.draw.rect(win, WHITE, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+    def __getstate__(self):
+        # Copies and pickles start with an empty move cache: its entries hold this board's pieces.
+        state = self.__dict__.copy()
+        state['_moves'] = {}
+        state['_touched'] = state['_flipped'] = 0
+        return state
+
+    @classmethod
+    def from_fen(cls, fen):
+        """Build a Board holding the position of a FEN string (see checkers.fen)."""
+        turn, white, red = parse_fen(fen)
+        board = cls()
+        board.remove_pieces(board.get_all_pieces(WHITE) + board.get_all_pieces(DARK_RED))
+        board.restore_pieces([Piece(row, col, WHITE) for row, col in white] +
+                             [Piece(row, col, DARK_RED) for row, col in red])
+        return board
 
     def create_board(self):
         """Initialize the actual Board without pieces."""
@@ -30,8 +87,10 @@ class Board:
                 if col % 2 == ((row + 1) % 2):
                     if row < 3:
                         self.board[row].append(Piece(row, col, WHITE))
+                        self.hash ^= piece_key(row, col, WHITE)
                     elif row > 4:
                         self.board[row].append(Piece(row, col, DARK_RED))
+                        self.hash ^= piece_key(row, col, DARK_RED)
                     else:
                         self.board[row].append(None)
                 else:
@@ -58,30 +117,54 @@ class Board:
         if piece is not None:
             self.board[piece.row][piece.col], self.board[row][col] = self.board[row][col], self.board[piece.row][
                 piece.col]
+            self.hash ^= piece_key(piece.row, piece.col, piece.color) ^ piece_key(row, col, piece.color)
+            changed = BITS[piece.row][piece.col] | BITS[row][col]
+            self._touched |= changed
+            self._flipped ^= changed << piece.color * ROWS * COLS
             piece.move(row, col)
 
     def get_piece(self, row, col):
         return self.board[row][col]
 
-    def draw(self, win):
-        """Draw all the squares and pieces."""
-        self.draw_squares(win)
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.board[row][col]
-                if piece is not None:
-                    piece.draw(win)
+    def play(self, start, end, skip, undo=False):
+        """Make a move given by the fields of a Move, or revert it with undo."""
+        if undo:
+            self.move(self.board[end[0]][end[1]], *start)
+            if skip:
+                self.restore_pieces(skip)
+        else:
+            self.move(self.board[start[0]][start[1]], *end)
+            if skip:
+                self.remove_pieces(skip)
 
     def remove_pieces(self, pieces):
         """Remove a defeated piece from board and return it."""
         for piece in pieces:
             if piece is not None:
                 self.board[piece.row][piece.col] = None
+                self.hash ^= piece_key(piece.row, piece.col, piece.color)
+                changed = BITS[piece.row][piece.col]
+                self._touched |= changed
+                self._flipped ^= changed << piece.color * ROWS * COLS
                 if piece.color == WHITE:
                     self.white_left -= 1
                 else:
                     self.black_left -= 1
 
+    def restore_pieces(self, pieces):
+        """Put pieces taken off by remove_pieces back on the board."""
+        for piece in pieces:
+            if piece is not None:
+                self.board[piece.row][piece.col] = piece
+                self.hash ^= piece_key(piece.row, piece.col, piece.color)
+                changed = BITS[piece.row][piece.col]
+                self._touched |= changed
+                self._flipped ^= changed << piece.color * ROWS * COLS
+                if piece.color == WHITE:
+                    self.white_left += 1
+                else:
+                    self.black_left += 1
+
     def get_winner(self):
         """Get winner if any."""
         if self.white_left <= 0:
@@ -92,185 +175,93 @@ class Board:
             return None
 
     def get_valid_moves(self, piece):
-        # The 'moves' arg stores pos (x, y) as keys, and the piece over which it jumps,
+        """
+        Get the valid moves of a piece on the board.
+        Asking again before the squares around the piece change returns the same dict, which must not be modified.
+        """
+        if self._touched:
+            # Drop the cached moves depending on the squares changed since the last lookup.
+            cached, touched, flipped = self._moves, self._touched, self._flipped
+            flipped = (flipped | flipped >> ROWS * COLS) & ((1 << ROWS * COLS) - 1)
+            for square in [square for square, (moves, depends, jumps) in cached.items()
+                           if depends & (touched if jumps else flipped)]:
+                del cached[square]
+            self._touched = self._flipped = 0
+        entry = self._moves.get((piece.row, piece.col))
+        if entry is not None:
+            self.move_hits += 1
+            return entry[0]
+        self.move_misses += 1
+
+        # The 'moves' arg stores pos (x, y) as keys, and the pieces over which it jumps,
         # or None for an empty square as values.
         moves = {}
-        row = piece.row
-        col = piece.col
-
-        # Get valid left-up moves.
-        moves.update(self._move_left(row - 1, max(row - 3, -1), -1, col - 1, piece.color))
+        board = self.board
+        color = piece.color
+        depends = REACH[piece.row][piece.col]
+        jumps = False
+
+        # Scan left-up, right-up, left-down then right-down.
+        for square, row, col, bit, landing in RAYS[piece.row][piece.col]:
+            target = board[row][col]
+            if target is None:
+                # We can move to a blank square without jumping, but only ONCE in this diagonal line.
+                moves[square] = None
+            elif target.color != color and landing is not None and board[landing[0]][landing[1]] is None:
+                depends |= self._jump(landing, color, [target], bit, moves)
+                jumps = True
+
+        self._moves[(piece.row, piece.col)] = moves, depends, jumps
+        return moves
 
-        # Get valid right-up moves.
-        moves.update(self._move_right(row - 1, max(row - 3, -1), -1, col + 1, piece.color))
+    def get_moves(self, color):
+        """Get the moves of all pieces of a given color as (start, end, jumped pieces or None), in get_move_list order."""
+        return [((piece.row, piece.col), end, skip) for piece in self.get_all_pieces(color)
+                for end, skip in self.get_valid_moves(piece).items()]
 
-        # Get valid left-down moves.
-        moves.update(self._move_left(row + 1, min(row + 3, ROWS), 1, col - 1, piece.color))
+    def get_captures(self, color):
+        """
+        Get the jumps of all pieces of a given color as (start, end, jumped pieces),
+        in the order get_move_list would give them.
+        """
+        return [((piece.row, piece.col), end, skip) for piece in self.get_all_pieces(color)
+                for end, skip in self.get_valid_moves(piece).items() if skip]
 
-        # Get valid right-down moves.
-        moves.update(self._move_right(row + 1, min(row + 3, ROWS), 1, col + 1, piece.color))
+    def get_quiet_moves(self, color):
+        """Get the moves of all pieces of a given color that do not jump, as (start, end) in get_move_list order."""
+        return [((piece.row, piece.col), end) for piece in self.get_all_pieces(color)
+                for end, skip in self.get_valid_moves(piece).items() if not skip]
 
-        return moves
+    @property
+    def move_hit_rate(self):
+        """The share of get_valid_moves calls answered from the cache."""
+        calls = self.move_hits + self.move_misses
+        return self.move_hits / calls if calls else 0.0
 
-    def _move_left(self, start, stop, step, col, color, jumped_pieces=None):
+    def _jump(self, landing, color, jumped_pieces, jumped, moves):
         """
-        Check if the selected piece can move to (row, col) position diagonally.
-
-        :param start: starts checking from start row.
-        :param stop: stops checking when reaches this stop row.
-        :param step: -1 if move up, and +1 if move down.
-        :param col: column to start checking.
-        :param color: color of the selected piece.
-        :param jumped_pieces: store stacked skipped pieces.
-        :return: valid moves.
-        """
-        moves = {}
-        last_selected = []
-        if jumped_pieces is None:
-            jumped_pieces = []
-
-        for row in range(start, stop, step):
-            if col < 0:
-                break
-
-            if (row, col) in map(lambda p: (p.row, p.col), jumped_pieces):
-                break
-
-            # Select the piece located at (row, col).
-            piece = self.get_piece(row, col)
-
-            # If a checker is selected.
-            if piece:
-                # If the selected piece is of the same Team,
-                # then this is an invalid move.
-                if piece.color == color:
-                    break
-                else:
-                    # If we've already jumped over another piece in this diagonal line,
-                    # then this is an invalid move.
-                    if last_selected:
-                        break
-                    # If we've not jumped any pieces before,
-                    # then we can jump over this piece.
-                    else:
-                        last_selected = [piece]
-            # Else the piece is available.
-            else:
-                # If we've jumped over some pieces (jumped_pieces)
-                if jumped_pieces:
-                    # And we can jump over another piece, then this is a valid move.
-                    if last_selected:
-                        moves[(row, col)] = jumped_pieces + last_selected
-                    # and we cannot jump over any piece, then this is an invalid move.
-                    else:
-                        break
-                # If we've never jumped over any piece
-                else:
-                    # And we can jump over a piece, then this is a valid move.
-                    if last_selected:
-                        moves[(row, col)] = last_selected
-                    # And we can move to a blank piece without jumping, then this is also a valid move,
-                    # but we can only move ONCE in this diagonal line.
-                    else:
-                        moves[(row, col)] = None
-                        break
-
-                # If a piece is jumped over.
-                if last_selected:
-                    # Recursive calls for multiple jumps.
-                    # Accumulate jumped_pieces for further recursive calls.
-                    jumped_pieces += last_selected
-                    # Move left up.
-                    moves.update(
-                        self._move_left(row - 1, max(row - 3, -1), -1, col - 1, color, jumped_pieces))
-                    # Move right up.
-                    moves.update(
-                        self._move_right(row - 1, max(row - 3, -1), -1, col + 1, color, jumped_pieces))
-                    # Move left down.
-                    moves.update(
-                        self._move_left(row + 1, min(row + 3, ROWS), 1, col - 1, color, jumped_pieces))
-                    # Move right down.
-                    moves.update(
-                        self._move_right(row + 1, min(row + 3, ROWS), 1, col + 1, color, jumped_pieces))
-                    break
-            col -= 1
-        return moves
+        Add a jump and every multiple jump continuing it to moves, depth first.
 
-    def _move_right(self, start, stop, step, col, color, jumped_pieces=None):
-        """
-        Check if the selected piece can move to (row, col) position diagonally.
-        :param start: starts checking at start row.
-        :param stop: stops checking at stop row.
-        :param step: -1 if move up, and +1 if move down.
-        :param col: column to start checking.
+        :param landing: (row, col) where the first jump lands.
         :param color: color of the selected piece.
-        :param jumped_pieces: store stacked skipped pieces.
-        :return: valid moves.
+        :param jumped_pieces: pieces jumped over to reach landing.
+        :param jumped: bitmask of the squares of jumped_pieces, which cannot be jumped over again.
+        :param moves: collects the valid moves; a square reached by several chains keeps the last one found.
+        :return: bitmask of the squares looked at, on which the chains depend.
         """
-        moves = {}
-        last_selected = []
-        if jumped_pieces is None:
-            jumped_pieces = []
-
-        for row in range(start, stop, step):
-            if col >= COLS:
-                break
-
-            # If we've already jumped over this piece in previous call, then break.
-            if (row, col) in map(lambda p: (p.row, p.col), jumped_pieces):
-                break
-
-            piece = self.get_piece(row, col)
-
-            # If a checker is selected.
-            if piece:
-                # If the selected piece is of the same Team,
-                # then this is an invalid move.
-                if piece.color == color:
-                    break
-                else:
-                    # If we've already jumped over another piece in this diagonal line,
-                    # then this is an invalid move.
-                    if last_selected:
-                        break
-                    # If we've not jumped any pieces before,
-                    # then we can jump over this piece.
-                    else:
-                        last_selected = [piece]
-            # Else the piece is available.
-            else:
-                # If we've jumped over some pieces (jumped_pieces)
-                if jumped_pieces:
-                    # And we can jump over another piece, then this is a valid move.
-                    if last_selected:
-                        moves[(row, col)] = jumped_pieces + last_selected
-                    # and we cannot jump over any piece, then this is an invalid move.
-                    else:
-                        break
-                # If we've never jumped over any piece
-                else:
-                    # And we can jump over a piece, then this is a valid move.
-                    if last_selected:
-                        moves[(row, col)] = last_selected
-                    # And we can move to a blank piece without jumping, then this is also a valid move,
-                    # but we can only move ONCE in this diagonal line.
-                    else:
-                        moves[(row, col)] = None
-                        break
-
-                # If a piece is jumped over.
-                if last_selected:
-                    # Recursive calls for multiple jumps.
-                    # Accumulate jumped_pieces for further recursive jumps.
-                    jumped_pieces += last_selected
-                    # Move left up.
-                    moves.update(self._move_left(row - 1, max(row - 3, -1), -1, col - 1, color, jumped_pieces))
-                    # Move right up.
-                    moves.update(self._move_right(row - 1, max(row - 3, -1), -1, col + 1, color, jumped_pieces))
-                    # Move left down.
-                    moves.update(self._move_left(row + 1, min(row + 3, ROWS), 1, col - 1, color, jumped_pieces))
-                    # Move right down.
-                    moves.update(self._move_right(row + 1, min(row + 3, ROWS), 1, col + 1, color, jumped_pieces))
-                    break
-            col += 1
-        return moves
+        board = self.board
+        depends = 0
+        stack = [(landing, jumped_pieces, jumped)]
+        while stack:
+            landing, jumped_pieces, jumped = stack.pop()
+            moves[landing] = jumped_pieces
+            depends |= REACH[landing[0]][landing[1]]
+            # Push in reverse so that the next jumps are popped left-up first, as the scan order.
+            # Jumped pieces stay on the board until the move is made, so they still block landings.
+            for _, row, col, bit, beyond in reversed(RAYS[landing[0]][landing[1]]):
+                if beyond is None or jumped & bit:
+                    continue
+                target = board[row][col]
+                if target is not None and target.color != color and board[beyond[0]][beyond[1]] is None:
+                    stack.append((beyond, jumped_pieces + [target], jumped | bit))
+        return depends
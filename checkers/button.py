@@ -1,6 +1,5 @@
-from checkers.constants import WHITE, DARK_GREEN
+from checkers.constants import WHITE_RGB, DARK_GREEN
 import pygame
-import pygame.sysfont
 
 
 class PlayButton:
@@ -13,8 +12,9 @@ class PlayButton:
         self.button_color = DARK_GREEN
 
         # Initialize the 'Play' message.
-        self.text_color = WHITE
-        self.font = pygame.font.SysFont(None, 40)
+        self.text_color = WHITE_RGB
+        # pygame's own font, which SysFont(None) falls back to, without the scan of the system fonts.
+        self.font = pygame.font.Font(None, 40)
 
         # Build the button and central it.
         self.rect = pygame.Rect(0, 0, self.width, self.height)
@@ -1,13 +1,16 @@
-import pygame
-
 WIDTH, HEIGHT = 640, 640
 ROWS, COLS = 8, 8
 SQUARE_SIZE = WIDTH // COLS
 
+# Piece colors, which are also the players.
+# The rules and the AI only compare these small ints; checkers.render turns them into RGB.
+WHITE, DARK_RED = 0, 1
+COLOR_NAMES = {WHITE: 'WHITE', DARK_RED: 'DARK_RED'}
+
 # RGB
 RED = (255, 0, 0)
-WHITE = (255, 255, 255)
-DARK_RED = (100, 0, 0)
+WHITE_RGB = (255, 255, 255)
+DARK_RED_RGB = (100, 0, 0)
 BLUE = (0, 110, 255)
 GREY = (230, 230, 230)
 DARK_GREEN = (10, 60, 20)
@@ -0,0 +1,47 @@
+from .constants import WHITE, DARK_RED
+
+# Positions are written as FEN strings in the PDN style, e.g. 'W:W1,2,3:B30,31,32'.
+# The first field is the side to move (W for white, B for red), the next two list the squares
+# of each side. Squares are numbered 1 to 32 row by row from the top-left playable square,
+# i.e. square = row * 4 + col // 2 + 1.
+START_FEN = 'B:W' + ','.join(str(n) for n in range(1, 13)) + ':B' + ','.join(str(n) for n in range(21, 33))
+
+
+def parse_fen(fen):
+    """
+    Parse a FEN string.
+    :return: the color to move, and the (row, col) of the white and of the red pieces.
+    """
+    fields = fen.strip().split(':')
+    if len(fields) != 3 or fields[0] not in ('W', 'B'):
+        raise ValueError('Invalid FEN: {!r}'.format(fen))
+    turn = WHITE if fields[0] == 'W' else DARK_RED
+    pieces = {}
+    taken = set()
+    for field in fields[1:]:
+        if not field or field[0] not in ('W', 'B') or field[0] in pieces:
+            raise ValueError('Invalid FEN: {!r}'.format(fen))
+        squares = [int(n) for n in field[1:].split(',') if n]
+        if any(not 1 <= n <= 32 for n in squares):
+            raise ValueError('Invalid square in FEN: {!r}'.format(fen))
+        # A square holds one piece: it can neither be listed twice nor given to both sides.
+        if len(set(squares)) != len(squares) or taken.intersection(squares):
+            raise ValueError('Square listed twice in FEN: {!r}'.format(fen))
+        taken.update(squares)
+        pieces[field[0]] = [_row_col(n) for n in squares]
+    return turn, pieces.get('W', []), pieces.get('B', [])
+
+
+def to_fen(board, turn):
+    """Write the position of a board, with turn to move, as a FEN string."""
+    white, red = [], []
+    for n in range(1, 33):
+        piece = board.get_piece(*_row_col(n))
+        if piece is not None:
+            (white if piece.color == WHITE else red).append(str(n))
+    return '{}:W{}:B{}'.format('W' if turn == WHITE else 'B', ','.join(white), ','.join(red))
+
+
+def _row_col(n):
+    row = (n - 1) // 4
+    return row, (n - 1) % 4 * 2 + 1 - row % 2
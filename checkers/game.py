@@ -1,20 +1,38 @@
 import pygame
 from .board import Board
+from .render import BoardRenderer, draw_board, draw_dot
 from .constants import WHITE, DARK_RED
-from .constants import BLUE, SQUARE_SIZE
+from .constants import BLUE, GREY
 
 
 class Game:
-    def __init__(self, win):
-        """Initialize the Game."""
+    def __init__(self, win, recorder=None, dirty_rects=True):
+        """
+        Initialize the Game.
+        :param recorder: an optional checkers.record.GameWriter that records every game played.
+        :param dirty_rects: only redraw and update the squares that changed since the last frame,
+            instead of the whole window every frame.
+        """
+        self.recorder = recorder
         # What piece is selected
         self._init()
         self.win = win
+        self.renderer = BoardRenderer(win) if dirty_rects else None
+        self.font = pygame.font.Font(None, 30)
+        self.thinking_img = self.font.render('Thinking...', True, BLUE, GREY)
+        self._stats_imgs = (None, [])
 
     def update(self):
         """Up date game's surface."""
-        self.board.draw(self.win)
+        if self.renderer is not None:
+            dirty = self.renderer.draw(self.board, self.valid_moves, self.get_overlays())
+            if dirty:
+                pygame.display.update(dirty)
+            return
+        draw_board(self.win, self.board)
         self.draw_valid_moves()
+        for surface, pos in self.get_overlays():
+            self.win.blit(surface, pos)
         pygame.display.update()
 
     def _init(self):
@@ -23,6 +41,12 @@ class Game:
         self.board = Board()
         self.turn = DARK_RED
         self.valid_moves = {}
+        # True while the AI is searching for its move.
+        self.thinking = False
+        # The SearchStats of the AI's last move, shown over the board when set.
+        self.stats = None
+        if self.recorder is not None:
+            self.recorder.begin_game()
 
     def reset(self):
         """Reset attributes."""
@@ -54,9 +78,11 @@ class Game:
         """Move the selected piece in to the (row, col) square."""
         piece = self.board.get_piece(row, col)
         if self.selected is not None and piece is None and (row, col) in self.valid_moves:
+            self._record((self.selected.row, self.selected.col), (row, col), self.valid_moves[(row, col)])
             self.board.move(self.selected, row, col)
             if self.valid_moves[(row, col)] is not None:
                 self.board.remove_pieces(self.valid_moves[(row, col)])
+            self._end_record()
             self.change_turn()
             return True
         return False
@@ -73,11 +99,29 @@ class Game:
 
     def draw_valid_moves(self):
         """Draw valid moves."""
-        for move in self.valid_moves:
-            row, col = move
-            pygame.draw.circle(self.win, BLUE,
-                               (col * SQUARE_SIZE + SQUARE_SIZE // 2, row * SQUARE_SIZE + SQUARE_SIZE // 2),
-                               SQUARE_SIZE // 8)
+        for row, col in self.valid_moves:
+            draw_dot(self.win, row, col)
+
+    def get_overlays(self):
+        """
+        Get the messages to show over the board, as (surface, (x, y)):
+        that the AI is searching, and the statistics of its last search in the bottom left corner.
+        The surfaces are rendered once and reused for as long as they do not change.
+        """
+        overlays = []
+        if self.thinking:
+            overlays.append((self.thinking_img, (10, 10)))
+        if self.stats is not None:
+            if self._stats_imgs[0] is not self.stats:
+                lines = self.stats.summary()
+                y = self.win.get_height() - 10 - len(lines) * self.font.get_linesize()
+                images = []
+                for line in lines:
+                    images.append((self.font.render(line, True, BLUE, GREY), (10, y)))
+                    y += self.font.get_linesize()
+                self._stats_imgs = (self.stats, images)
+            overlays += self._stats_imgs[1]
+        return overlays
 
     def get_winner(self):
         """Get the winner if any."""
@@ -87,7 +131,24 @@ class Game:
         """Get the board."""
         return self.board
 
-    def ai_move(self, board):
-        """Update the current board with a new board containing AI's move."""
-        self.board = board
-        self.change_turn()
\ No newline at end of file
+    def ai_move(self, move):
+        """Apply the move chosen by the AI to the current board."""
+        if move is not None:
+            self._record(move.start, move.end, move.skip)
+            self.board.move(self.board.get_piece(*move.start), *move.end)
+            if move.skip:
+                self.board.remove_pieces(move.skip)
+            self._end_record()
+        self.change_turn()
+
+    def _record(self, start, end, skip):
+        """Record a move if the game is being recorded."""
+        if self.recorder is not None:
+            self.recorder.write_move(start, end, skip)
+
+    def _end_record(self):
+        """Finish the record once the game has a winner."""
+        if self.recorder is not None and self.recorder.in_game:
+            winner = self.board.get_winner()
+            if winner is not None:
+                self.recorder.end_game(winner)
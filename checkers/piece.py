@@ -1,10 +1,9 @@
-from .constants import WHITE, SQUARE_SIZE, GREY
-import pygame
+from .constants import WHITE, COLOR_NAMES
 
 
 class Piece:
-    PADDING = 15
-    OUTLINE = 2
+    # Pieces are created and moved in every search node, so they carry no __dict__.
+    __slots__ = ('row', 'col', 'color')
 
     def __init__(self, row, col, color):
         """Initialize a piece."""
@@ -12,31 +11,15 @@ class Piece:
         self.col = col
         self.color = color
 
-        if self.color == WHITE:
-            # If piece if WHITE, it is located at the bottom of the Board,
-            # So it needs to move down.
-            self.direction = 1
-        else:
-            self.direction = -1
-
-        self.x = 0
-        self.y = 0
-        self.calc_pos()
-
-    def calc_pos(self):
-        """Calculate the position of Piece based on the row and col it is in."""
-        self.x = SQUARE_SIZE * self.col + SQUARE_SIZE // 2
-        self.y = SQUARE_SIZE * self.row + SQUARE_SIZE // 2
-
-    def draw(self, win):
-        radius = SQUARE_SIZE // 2 - self.PADDING
-        pygame.draw.circle(win, GREY, (self.x, self.y), radius + self.OUTLINE)
-        pygame.draw.circle(win, self.color, (self.x, self.y), radius)
+    @property
+    def direction(self):
+        # If piece if WHITE, it is located at the bottom of the Board,
+        # So it needs to move down.
+        return 1 if self.color == WHITE else -1
 
     def move(self, row, col):
         self.row = row
         self.col = col
-        self.calc_pos()
 
     def __repr__(self):
-        return str(self.color)
+        return COLOR_NAMES[self.color]
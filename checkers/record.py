@@ -0,0 +1,135 @@
+from collections import namedtuple
+from .bitboard import square_of, row_col
+
+# Binary game records.
+#
+# A file starts with MAGIC and holds any number of games. A game is GAME_START, its moves, then GAME_END
+# followed by one result byte: 0 if unfinished or drawn, 1 + the winner's color otherwise.
+# A move is its start square, with CAPTURE_FLAG set if it jumps, then its end square; a jump is followed
+# by the number of jumped pieces and their squares in jump order. Squares are 0-31, see checkers.bitboard.
+# A quiet move takes 2 bytes, a single jump 4.
+MAGIC = b'CKR1'
+GAME_START = 0xFE
+GAME_END = 0xFF
+CAPTURE_FLAG = 0x80
+
+# A move read back from a record: start and end are (row, col), captured the (row, col) of the jumped pieces.
+RecordedMove = namedtuple('RecordedMove', ['start', 'end', 'captured'])
+
+
+class GameWriter:
+    """Append games to a binary record, one move at a time."""
+
+    def __init__(self, file):
+        """
+        :param file: a file opened in binary write or append mode.
+        """
+        self.file = file
+        if file.tell() == 0:
+            file.write(MAGIC)
+        self.in_game = False
+        self._buffer = bytearray()
+
+    @classmethod
+    def open(cls, path):
+        """Open a record file for appending."""
+        return cls(open(path, 'ab'))
+
+    def begin_game(self):
+        """Start a new game, ending the current one as unfinished."""
+        if self.in_game:
+            self.end_game(None)
+        self._buffer.append(GAME_START)
+        self.in_game = True
+
+    def write_move(self, start, end, skip=None):
+        """
+        Add a move to the current game.
+        :param start: (row, col) the piece moved from.
+        :param end: (row, col) the piece moved to.
+        :param skip: the jumped pieces, or None.
+        """
+        buffer = self._buffer
+        if skip:
+            buffer.append(square_of(*start) | CAPTURE_FLAG)
+            buffer.append(square_of(*end))
+            buffer.append(len(skip))
+            buffer.extend(square_of(piece.row, piece.col) for piece in skip)
+        else:
+            buffer.append(square_of(*start))
+            buffer.append(square_of(*end))
+
+    def end_game(self, winner):
+        """End the current game with the color of the winner, or None, and write it out."""
+        self._buffer.append(GAME_END)
+        self._buffer.append(0 if winner is None else winner + 1)
+        self.file.write(self._buffer)
+        self._buffer.clear()
+        self.in_game = False
+
+    def close(self):
+        if self.in_game:
+            self.end_game(None)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_games(file, chunk_size=1 << 16):
+    """
+    Read games back from a record, one at a time, without loading the whole file.
+    :param file: a path, or a file opened in binary read mode.
+    :return: a generator of (moves, winner), where moves is a list of RecordedMove and winner a color or None.
+    """
+    if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+        with open(file, 'rb') as f:
+            yield from read_games(f, chunk_size)
+        return
+
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError('Not a game record')
+    data = _iter_bytes(file, chunk_size)
+    for marker in data:
+        if marker != GAME_START:
+            raise ValueError('Corrupt game record: expected the start of a game')
+        try:
+            yield _read_game(data)
+        except StopIteration:
+            raise ValueError('Corrupt game record: truncated game') from None
+
+
+def _read_game(data):
+    """Read the moves and the result of a game from an iterator of bytes positioned after GAME_START."""
+    moves = []
+    while True:
+        first = next(data)
+        if first == GAME_END:
+            result = next(data)
+            return moves, None if result == 0 else result - 1
+        end = row_col(next(data))
+        if first & CAPTURE_FLAG:
+            count = next(data)
+            captured = tuple(row_col(next(data)) for _ in range(count))
+            moves.append(RecordedMove(row_col(first & ~CAPTURE_FLAG), end, captured))
+        else:
+            moves.append(RecordedMove(row_col(first), end, ()))
+
+
+def _iter_bytes(file, chunk_size):
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield from chunk
+
+
+def apply_recorded_move(board, move):
+    """Play a RecordedMove on a Board or BitBoard."""
+    captured = [board.get_piece(row, col) for row, col in move.captured]
+    board.move(board.get_piece(*move.start), *move.end)
+    if captured:
+        board.remove_pieces(captured)
@@ -0,0 +1,114 @@
+import pygame
+from .constants import WHITE, DARK_RED, WHITE_RGB, DARK_RED_RGB, DARK_GREEN, GREY, BLUE, ROWS, COLS, SQUARE_SIZE
+from .piece import Piece
+
+# Drawing is kept apart from the rules, so Board, Piece and the AI never import pygame.
+PADDING = 15
+OUTLINE = 2
+PIECE_RGB = {WHITE: WHITE_RGB, DARK_RED: DARK_RED_RGB}
+
+
+def draw_squares(win):
+    """Draw atomic squares of the Board."""
+    win.fill(DARK_GREEN)
+    for row in range(ROWS):
+        for col in range(row % 2, COLS, 2):
+            pygame.draw.rect(win, WHITE_RGB, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+
+
+def draw_piece(win, piece):
+    """Draw a piece in the middle of its square."""
+    x = SQUARE_SIZE * piece.col + SQUARE_SIZE // 2
+    y = SQUARE_SIZE * piece.row + SQUARE_SIZE // 2
+    radius = SQUARE_SIZE // 2 - PADDING
+    pygame.draw.circle(win, GREY, (x, y), radius + OUTLINE)
+    pygame.draw.circle(win, PIECE_RGB[piece.color], (x, y), radius)
+
+
+def draw_dot(win, row, col):
+    """Draw the dot marking a valid move to (row, col)."""
+    pygame.draw.circle(win, BLUE, (col * SQUARE_SIZE + SQUARE_SIZE // 2, row * SQUARE_SIZE + SQUARE_SIZE // 2),
+                       SQUARE_SIZE // 8)
+
+
+def draw_board(win, board):
+    """Draw all the squares and pieces of a board."""
+    draw_squares(win)
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = board.get_piece(row, col)
+            if piece is not None:
+                draw_piece(win, piece)
+
+
+class BoardRenderer:
+    """
+    Draw a board incrementally.
+    The empty board is rendered once into a background surface; each frame then only redraws the squares
+    whose piece or valid-move dot changed, and returns their rects to pass to pygame.display.update.
+    """
+
+    def __init__(self, win):
+        self.win = win
+        self.background = pygame.Surface((COLS * SQUARE_SIZE, ROWS * SQUARE_SIZE))
+        draw_squares(self.background)
+        # (row, col) -> (color of the piece or None, whether it has a dot) as last drawn, or None to redraw all.
+        self._drawn = None
+        self._key = None
+        self._overlays = []
+
+    def invalidate(self):
+        """Redraw everything on the next frame, e.g. after something else has drawn over the window."""
+        self._drawn = None
+
+    def draw(self, board, dots=(), overlays=()):
+        """
+        Bring the window up to date with board.
+        :param dots: the (row, col) of the valid moves to mark.
+        :param overlays: (surface, (x, y)) to blit over the board, e.g. messages; pass the same surfaces
+            every frame while they do not change, as they are compared by identity.
+        :return: the rects of the window that changed, empty if nothing did.
+        """
+        overlays = list(overlays)
+        key = (board.hash, frozenset(dots), overlays)
+        if self._drawn is not None and key == self._key:
+            return []
+        self._key = key
+
+        state = {}
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = board.get_piece(row, col)
+                state[(row, col)] = (None if piece is None else piece.color, (row, col) in dots)
+
+        if self._drawn is None:
+            self.win.blit(self.background, (0, 0))
+            changed = [square for square, (color, dot) in state.items() if color is not None or dot]
+            dirty = [self.background.get_rect()]
+        else:
+            changed = [square for square, drawn in state.items() if drawn != self._drawn[square]]
+            if overlays != self._overlays:
+                # Uncover what the old overlays hid and redraw what the new ones will cover.
+                covered = [surface.get_rect(topleft=pos) for surface, pos in self._overlays + overlays]
+                changed += [square for square in state if square not in changed and
+                            _square_rect(*square).collidelist(covered) != -1]
+            dirty = [_square_rect(*square) for square in changed]
+        self._drawn = state
+        self._overlays = overlays
+
+        for row, col in changed:
+            rect = _square_rect(row, col)
+            self.win.blit(self.background, rect, rect)
+            color, dot = state[(row, col)]
+            if color is not None:
+                draw_piece(self.win, Piece(row, col, color))
+            if dot:
+                draw_dot(self.win, row, col)
+        if dirty:
+            for surface, pos in overlays:
+                dirty.append(self.win.blit(surface, pos))
+        return dirty
+
+
+def _square_rect(row, col):
+    return pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
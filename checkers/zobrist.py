@@ -0,0 +1,32 @@
+import random
+from .constants import ROWS, COLS
+
+# A fixed seed keeps hashes identical across runs and worker processes.
+_random = random.Random(0x636865636b657273)
+
+# PIECE_KEYS[row][col][color] is the key of a piece of that color on the square.
+PIECE_KEYS = [[(_random.getrandbits(64), _random.getrandbits(64)) for col in range(COLS)] for row in range(ROWS)]
+
+# XOR-ed into a position hash when red is to move.
+SIDE_KEY = _random.getrandbits(64)
+
+
+def piece_key(row, col, color):
+    """Get the key of a piece of a given color standing on (row, col)."""
+    return PIECE_KEYS[row][col][color]
+
+
+def board_hash(board):
+    """Compute the hash of a board from scratch."""
+    value = 0
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = board.get_piece(row, col)
+            if piece is not None:
+                value ^= piece_key(row, col, piece.color)
+    return value
+
+
+def position_hash(board, max_player):
+    """Get the hash of the board with white (max_player) or red to move."""
+    return board.hash if max_player else board.hash ^ SIDE_KEY
@@ -1,11 +1,17 @@
+import os
 import pygame
-from checkers.constants import WIDTH, HEIGHT, SQUARE_SIZE, WHITE
-from checkers.game import Game
-from minimax.algorithm import minimax
+from checkers.assets import load_image
+from checkers.constants import WIDTH, HEIGHT, SQUARE_SIZE, WHITE, COLOR_NAMES
 from checkers.button import PlayButton
 
 BG_DIR = 'asset/bg.jpg'
 ICON_DIR = 'asset/icon.jfif'
+# Built by tools.build_book; the AI searches every position when it is missing.
+BOOK_DIR = 'asset/opening.book'
+AI_TIME_BUDGET_MS = 500
+TT_SIZE_MB = 32
+# The images scaled and converted for the window, read back at later launches instead of decoded again.
+CACHE_DIR = 'asset/cache'
 
 
 class Checker:
@@ -18,27 +24,45 @@ class Checker:
         # Init game status attributes.
         self.active = True
         self.new_game = True
+        # The start screen does not change, so it is only drawn again once the window needs it.
+        self.menu_drawn = False
         self.clock = pygame.time.Clock()
 
-        # Create game object.
-        self.game = Game(self.win)
+        # The game and the AI are only created once Play is clicked, so the start screen does not wait for them.
+        self.game = None
+        self.worker = None
 
         # Create PLAY button.
         self.play_button = PlayButton(self.win)
 
         # Load background image.
-        self.bg_img = pygame.transform.scale(pygame.image.load(BG_DIR), (WIDTH, HEIGHT))
+        self.bg_img = load_image(BG_DIR, (WIDTH, HEIGHT), CACHE_DIR)
+
+    def _create_game(self):
+        """Create the game object and the AI, which searches on a background thread."""
+        # Imported here, as the start screen needs none of them.
+        from checkers.game import Game
+        from minimax.algorithm import MoveOrdering
+        from minimax.book import OpeningBook
+        from minimax.transposition import TranspositionTable
+        from minimax.worker import SearchWorker
+
+        self.game = Game(self.win)
+        book = OpeningBook(BOOK_DIR) if os.path.exists(BOOK_DIR) else None
+        self.worker = SearchWorker(AI_TIME_BUDGET_MS, MoveOrdering(), TranspositionTable(TT_SIZE_MB), book=book)
 
     def _init_pygame_object(self, game_caption, window_size, fps):
         """Initialize pygame object with some basic attributes."""
-        pygame.init()
+        # Only the modules the game uses: pygame.init() would also open the audio device, which can take a while.
+        pygame.display.init()
+        pygame.font.init()
         pygame.display.set_caption(game_caption)
         self.FPS = fps
         self.win = pygame.display.set_mode(window_size)
 
     def _init_icon(self, icon_path):
         """Initialize icon for the game."""
-        self.icon = pygame.image.load(ICON_DIR)
+        self.icon = load_image(icon_path, cache_dir=CACHE_DIR)
         pygame.display.set_icon(self.icon)
 
     @classmethod
@@ -52,9 +76,14 @@ class Checker:
         """Handle key and mouse interactions."""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                self.active = False
+                self._quit()
             elif event.type == pygame.KEYDOWN:
                 self._check_keydown_events(event)
+            elif event.type == pygame.VIDEOEXPOSE:
+                # The window contents were lost; only changed squares are redrawn otherwise.
+                self.menu_drawn = False
+                if self.game is not None and self.game.renderer is not None:
+                    self.game.renderer.invalidate()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_pos = pygame.mouse.get_pos()
                 if self.new_game:
@@ -67,16 +96,46 @@ class Checker:
     def _check_keydown_events(self, event):
         """Handle keypress events."""
         if event.key == pygame.K_q:
-            self.active = False
+            self._quit()
+        elif event.key == pygame.K_r:
+            self._reset()
+        elif event.key == pygame.K_i:
+            self._toggle_stats()
+
+    def _quit(self):
+        """Stop the game loop and the AI search."""
+        if self.worker is not None:
+            self.worker.cancel()
+        self.active = False
+
+    def _reset(self):
+        """Drop the AI search and start the game over."""
+        if self.game is None:
+            return
+        self.worker.cancel()
+        self.game.reset()
+
+    def _toggle_stats(self):
+        """Show or hide the statistics of the AI's searches, which are only collected while shown."""
+        if self.worker is None:
+            return
+        self.worker.collect_stats = not self.worker.collect_stats
+        self.worker.stats = None
+        self.game.stats = None
 
     def _check_button(self, mouse_pos):
         """Start a new game when user click the Play button."""
         play_clicked = self.play_button.rect.collidepoint(mouse_pos)
         if play_clicked:
+            if self.game is None:
+                self._create_game()
             self.new_game = False
 
     def _start_new_game(self):
         """Start a new game."""
+        if self.menu_drawn:
+            return
+        self.menu_drawn = True
         self.win.fill((0, 0, 0))
         self.win.blit(self.bg_img, (0, 0))
         self.play_button.draw_button()
@@ -86,8 +145,25 @@ class Checker:
         """Check if there is a winner."""
         winner = self.game.get_winner()
         if winner is not None:
-            print(winner)
-            self.active = False
+            print(COLOR_NAMES[winner])
+            self._quit()
+
+    def _play_ai(self):
+        """Start the AI search, or play its move once it is ready."""
+        if self.worker.idle:
+            self.worker.start(self.game.get_board(), True)
+        else:
+            result = self.worker.poll()
+            if result is not None:
+                value, move, depth = result
+                self.game.ai_move(move)
+                self.game.stats = self.worker.stats
+        self.game.thinking = self.worker.thinking
+
+    def _ponder(self):
+        """Let the AI search the replies to the position while the player thinks."""
+        if self.worker.idle:
+            self.worker.ponder(self.game.get_board(), True)
 
     def run(self):
         while self.active:
@@ -95,8 +171,9 @@ class Checker:
 
             if not self.new_game:
                 if self.game.turn == WHITE:
-                    value, new_board = minimax(self.game.get_board(), 3, True, self.game)
-                    self.game.ai_move(new_board)
+                    self._play_ai()
+                else:
+                    self._ponder()
 
                 self._check_winner()
                 self.game.update()
@@ -106,7 +183,8 @@ class Checker:
             self._check_events()
 
 
-pygame.quit()
+if __name__ == '__main__':
+    pygame.quit()
 
-game = Checker()
-game.run()
+    game = Checker()
+    game.run()
@@ -1,8 +1,15 @@
+from collections import namedtuple
 from copy import deepcopy
-import pygame
+import json
+import time
+from checkers.constants import WHITE, DARK_RED, ROWS, COLS
+from checkers.zobrist import position_hash
+from .transposition import EXACT, LOWER, UPPER, TranspositionTable
 
-WHITE = (255, 255, 255)
-DARK_RED = (100, 0, 0)
+# A lightweight move descriptor.
+# start and end are (row, col) of the moved piece, skip holds the jumped pieces or None.
+# Together with the board it was generated on, this is enough to apply and revert the move.
+Move = namedtuple('Move', ['start', 'end', 'skip'])
 
 
 def minimax(board, depth, max_player, game):
@@ -47,14 +54,544 @@ def simulate_moves(piece, move, board, game, skip):
 
 
 def get_all_moves(board, color, game):
-    moves = []
-
+    """
+    Yield the board after each move of a given color.
+    A board is only copied when the next one is asked for, so minimax holds one child per node at a time.
+    """
     for piece in board.get_all_pieces(color):
         valid_moves = board.get_valid_moves(piece)
         for move, skip in valid_moves.items():
             temp_board = deepcopy(board)
             temp_piece = temp_board.get_piece(piece.row, piece.col)
-            new_board = simulate_moves(temp_piece, move, temp_board, game, skip)
-            moves.append(new_board)
+            yield simulate_moves(temp_piece, move, temp_board, game, skip)
+
+
+def minimax_move(board, depth, max_player, game=None, stats=None):
+    """
+    Implement the minimax algorithm by making and unmaking moves on a single board.
+    It explores the same tree as minimax, but never copies the board.
+    :param board: the board to search; it is restored to its original position on return.
+    :param depth: the depth of the decision-making tree of the algorithm.
+    :param max_player: if True, we're the maximizing player; otherwise, minimizing.
+    :param game: the game object.
+    :param stats: an optional SearchStats to count the visited nodes.
+    :return: the game value and the best Move, or None if there is no move to make.
+    """
+    if stats is not None:
+        stats.nodes += 1
+    if depth == 0 or board.get_winner() is not None:
+        return board.evaluate(), None
+
+    if max_player is True:
+        max_eval = float('-inf')
+        best_move = None
+        for move in get_move_list(board, WHITE):
+            make_move(board, move)
+            evaluation = minimax_move(board, depth - 1, False, game, stats)[0]
+            unmake_move(board, move)
+            max_eval = max(max_eval, evaluation)
+            if max_eval == evaluation:
+                best_move = move
+        return max_eval, best_move
+    else:
+        min_eval = float('inf')
+        best_move = None
+        for move in get_move_list(board, DARK_RED):
+            make_move(board, move)
+            evaluation = minimax_move(board, depth - 1, True, game, stats)[0]
+            unmake_move(board, move)
+            min_eval = min(min_eval, evaluation)
+            if min_eval == evaluation:
+                best_move = move
+        return min_eval, best_move
+
+
+class SearchStats:
+    """
+    Counters and timings collected during a search.
+    The searches only touch them when they are given a SearchStats, so an uninstrumented search pays nothing.
+    """
+    # The phases of a node timed when timed is True. 'copy' is the time spent applying and reverting moves,
+    # which is what copying the board cost in minimax.
+    PHASES = ('movegen', 'copy', 'eval')
+
+    def __init__(self, timed=False):
+        """
+        :param timed: also time the phases of every node, which slows the search down noticeably.
+        """
+        self.nodes = 0
+        self.leaves = 0
+        self.cutoffs = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.timed = timed
+        self.phases = dict.fromkeys(self.PHASES, 0.0)
+        # (depth, nodes, seconds) of every completed alphabeta call, one per iterative deepening iteration.
+        self.iterations = []
+
+    def __repr__(self):
+        return 'SearchStats(nodes={}, leaves={}, cutoffs={}, tt_hits={}, tt_cutoffs={})'.format(
+            self.nodes, self.leaves, self.cutoffs, self.tt_hits, self.tt_cutoffs)
+
+    @property
+    def effective_branching_factor(self):
+        """The b such that b ** depth is the number of nodes of the deepest completed iteration, or None."""
+        if not self.iterations:
+            return None
+        depth, nodes, seconds = self.iterations[-1]
+        return nodes ** (1 / depth)
+
+    def generate(self, board, color):
+        """get_move_list, timed as movegen."""
+        if not self.timed:
+            return get_move_list(board, color)
+        start = time.perf_counter()
+        moves = get_move_list(board, color)
+        self.phases['movegen'] += time.perf_counter() - start
+        return moves
+
+    def make(self, board, move):
+        """make_move, timed as copy."""
+        if not self.timed:
+            return make_move(board, move)
+        start = time.perf_counter()
+        make_move(board, move)
+        self.phases['copy'] += time.perf_counter() - start
+
+    def unmake(self, board, move):
+        """unmake_move, timed as copy."""
+        if not self.timed:
+            return unmake_move(board, move)
+        start = time.perf_counter()
+        unmake_move(board, move)
+        self.phases['copy'] += time.perf_counter() - start
+
+    def leaf(self, board, evaluator):
+        """Count and evaluate a leaf, timed as eval."""
+        self.leaves += 1
+        if not self.timed:
+            return board.evaluate() if evaluator is None else evaluator.evaluate(board)
+        start = time.perf_counter()
+        value = board.evaluate() if evaluator is None else evaluator.evaluate(board)
+        self.phases['eval'] += time.perf_counter() - start
+        return value
+
+    def as_dict(self):
+        """Get every counter and timing as plain JSON-serializable values."""
+        return {
+            'nodes': self.nodes,
+            'leaves': self.leaves,
+            'cutoffs': self.cutoffs,
+            'tt_hits': self.tt_hits,
+            'tt_cutoffs': self.tt_cutoffs,
+            'ebf': self.effective_branching_factor,
+            'iterations': [{'depth': depth, 'nodes': nodes, 'seconds': seconds}
+                           for depth, nodes, seconds in self.iterations],
+            'phases': dict(self.phases) if self.timed else None,
+        }
+
+    def write_json(self, file, **extra):
+        """Append the stats to file as one JSON line, along with any extra fields."""
+        file.write(json.dumps(dict(extra, **self.as_dict())) + '\n')
+
+    def summary(self):
+        """Get a few short lines describing the search, for display."""
+        lines = ['nodes {}  leaves {}  cutoffs {}'.format(self.nodes, self.leaves, self.cutoffs),
+                 'tt hits {}  tt cutoffs {}'.format(self.tt_hits, self.tt_cutoffs)]
+        if self.iterations:
+            lines.append('depth {}  ebf {:.2f}'.format(self.iterations[-1][0], self.effective_branching_factor))
+            lines.append('ms/ply ' + ' '.join('{:.0f}'.format(seconds * 1000) for _, _, seconds in self.iterations))
+        if self.timed:
+            lines.append('  '.join('{} {:.0f} ms'.format(phase, seconds * 1000)
+                                   for phase, seconds in self.phases.items()))
+        return lines
+
+
+class MoveOrdering:
+    """
+    Order moves so that alpha-beta finds cutoffs early:
+    captures first, longer capture chains before shorter ones,
+    then killer moves of the same ply, then quiet moves by their history score.
+    """
+
+    def __init__(self, killer_slots=2):
+        self.killer_slots = killer_slots
+        # ply -> (start, end) of the last quiet moves that caused a cutoff at that ply.
+        self.killers = {}
+        # (start, end) -> accumulated depth * depth of the cutoffs caused by that quiet move.
+        self.history = {}
+
+    def order(self, moves, ply):
+        """Return moves sorted from the most to the least promising."""
+        killers = self.killers.get(ply, ())
+        history = self.history
+
+        def key(move):
+            squares = (move.start, move.end)
+            return len(move.skip) if move.skip else 0, squares in killers, history.get(squares, 0)
+
+        return sorted(moves, key=key, reverse=True)
+
+    def cutoff(self, move, ply, depth):
+        """Remember a move that caused a cutoff at ply with depth plies left."""
+        if move.skip:
+            # Captures are already searched first.
+            return
+        squares = (move.start, move.end)
+        killers = self.killers.setdefault(ply, [])
+        if squares not in killers:
+            killers.insert(0, squares)
+            del killers[self.killer_slots:]
+        self.history[squares] = self.history.get(squares, 0) + depth * depth
+
+    def clear(self):
+        self.killers.clear()
+        self.history.clear()
+
 
+def alphabeta(board, depth, max_player, game=None, ordering=None, stats=None, tt=None, pv=None, deadline=None,
+              stop=None, evaluator=None, tablebase=None, move_cache=None):
+    """
+    Implement the minimax algorithm with alpha-beta pruning.
+    Without a transposition table it returns the same value and the same best move as minimax_move
+    for a given depth: moves are searched in the order given by ordering, but ties between equally good
+    root moves are still broken in favour of the last one generated, as minimax does.
+    :param board: the board to search; it is restored to its original position on return.
+    :param depth: the depth of the decision-making tree of the algorithm.
+    :param max_player: if True, we're the maximizing player; otherwise, minimizing.
+    :param game: the game object.
+    :param ordering: an optional MoveOrdering, or any object with the same order and cutoff methods.
+    :param stats: an optional SearchStats to collect counters and timings; the search is recorded
+        in its iterations.
+    :param tt: an optional TranspositionTable; results stored at the same or a greater depth are reused.
+    :param pv: an optional principal variation, as a list of (start, end), whose moves are searched first.
+    :param deadline: an optional time.perf_counter() value after which the search raises SearchTimeout.
+    :param stop: an optional threading.Event; the search raises SearchTimeout once it is set.
+    :param evaluator: an optional Evaluator used instead of board.evaluate; the children of the nodes
+        one ply above the leaves are then scored together in one evaluate_children call.
+    :param tablebase: an optional Tablebase; positions it covers are scored from it instead of searched.
+    :param move_cache: an optional MoveCache the moves of the positions below the root are taken from.
+    :return: the game value and the best Move, or None if there is no move to make.
+    """
+    if stats is not None:
+        started, nodes_before = time.perf_counter(), stats.nodes
+        stats.nodes += 1
+    if depth == 0 or board.get_winner() is not None:
+        if stats is not None:
+            return stats.leaf(board, evaluator), None
+        return (board.evaluate() if evaluator is None else evaluator.evaluate(board)), None
+
+    color = WHITE if max_player else DARK_RED
+    moves = get_move_list(board, color) if stats is None else stats.generate(board, color)
+    index = {id(move): i for i, move in enumerate(moves)}
+    if ordering is not None:
+        moves = ordering.order(moves, 0)
+    if tt is not None:
+        key = position_hash(board, max_player)
+        entry = tt.probe(key)
+        if entry is not None:
+            if stats is not None:
+                stats.tt_hits += 1
+            moves = _best_first(moves, entry[3])
+    if pv:
+        moves = _best_first(moves, pv[0])
+
+    alpha, beta = float('-inf'), float('inf')
+    best_eval = alpha if max_player else beta
+    best_move = None
+    make, unmake = (make_move, unmake_move) if stats is None else (stats.make, stats.unmake)
+    for move in moves:
+        child_pv = pv[1:] if pv and (move.start, move.end) == pv[0] else None
+        make(board, move)
+        try:
+            evaluation = _alphabeta(board, depth - 1, not max_player, alpha, beta, 1, ordering, stats, tt,
+                                    child_pv, deadline, stop, evaluator, tablebase, move_cache)
+        finally:
+            unmake(board, move)
+        if evaluation == best_eval and best_move is not None and index[id(move)] < index[id(best_move)]:
+            continue
+        if max_player:
+            if evaluation >= best_eval:
+                best_eval, best_move = evaluation, move
+                alpha = max(alpha, evaluation)
+        elif evaluation <= best_eval:
+            best_eval, best_move = evaluation, move
+            beta = min(beta, evaluation)
+
+    if tt is not None and best_move is not None:
+        tt.store(key, depth, best_eval, EXACT, (best_move.start, best_move.end))
+    if stats is not None:
+        stats.iterations.append((depth, stats.nodes - nodes_before, time.perf_counter() - started))
+    return best_eval, best_move
+
+
+def _alphabeta(board, depth, max_player, alpha, beta, ply, ordering, stats, tt, pv, deadline, stop, evaluator,
+               tablebase, move_cache):
+    """
+    Search a node below the root of alphabeta and return its game value.
+    The window [alpha, beta] is closed: a node only cuts off once its value is strictly outside it,
+    so a value equal to a bound is exact and alphabeta can break ties at the root like minimax.
+    """
+    if stats is not None:
+        stats.nodes += 1
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+    if stop is not None and stop.is_set():
+        raise SearchTimeout()
+    if tablebase is not None:
+        score = tablebase.score(board, max_player, ply)
+        if score is not None:
+            if stats is not None:
+                stats.leaves += 1
+            return score
+    if depth == 0 or board.get_winner() is not None:
+        if stats is not None:
+            return stats.leaf(board, evaluator)
+        return board.evaluate() if evaluator is None else evaluator.evaluate(board)
+
+    best = None
+    if tt is not None:
+        key = position_hash(board, max_player)
+        entry = tt.probe(key)
+        if entry is not None:
+            if stats is not None:
+                stats.tt_hits += 1
+            entry_depth, score, flag, best = entry
+            if entry_depth >= depth:
+                if flag == EXACT or (flag == LOWER and score > beta) or (flag == UPPER and score < alpha):
+                    if stats is not None:
+                        stats.tt_cutoffs += 1
+                    return score
+        alpha_start, beta_start = alpha, beta
+
+    color = WHITE if max_player else DARK_RED
+    first = [pv[0]] if pv else []
+    if best is not None:
+        first.append(best)
+    moves = _staged_moves(board, color, ordering, ply, first, stats, move_cache)
+
+    best_move = None
+    make, unmake = (make_move, unmake_move) if stats is None else (stats.make, stats.unmake)
+    if depth == 1 and evaluator is not None and tablebase is None:
+        # Score all the leaves below this node in a single call.
+        moves = list(moves)
+        best_eval = float('-inf') if max_player else float('inf')
+        if moves:
+            if stats is not None:
+                stats.nodes += len(moves)
+                stats.leaves += len(moves)
+                started = time.perf_counter() if stats.timed else None
+            values = list(evaluator.evaluate_children(board, moves, color))
+            if stats is not None and stats.timed:
+                stats.phases['eval'] += time.perf_counter() - started
+            best_eval = max(values) if max_player else min(values)
+            best_move = moves[values.index(best_eval)]
+            best_eval = float(best_eval)
+    elif max_player:
+        best_eval = float('-inf')
+        for move in moves:
+            child_pv = pv[1:] if pv and (move.start, move.end) == pv[0] else None
+            make(board, move)
+            try:
+                evaluation = _alphabeta(board, depth - 1, False, alpha, beta, ply + 1, ordering, stats, tt,
+                                        child_pv, deadline, stop, evaluator, tablebase, move_cache)
+            finally:
+                unmake(board, move)
+            if evaluation > best_eval or best_move is None:
+                best_eval, best_move = evaluation, move
+            alpha = max(alpha, evaluation)
+            if alpha > beta:
+                if stats is not None:
+                    stats.cutoffs += 1
+                if ordering is not None:
+                    ordering.cutoff(move, ply, depth)
+                break
+    else:
+        best_eval = float('inf')
+        for move in moves:
+            child_pv = pv[1:] if pv and (move.start, move.end) == pv[0] else None
+            make(board, move)
+            try:
+                evaluation = _alphabeta(board, depth - 1, True, alpha, beta, ply + 1, ordering, stats, tt,
+                                        child_pv, deadline, stop, evaluator, tablebase, move_cache)
+            finally:
+                unmake(board, move)
+            if evaluation < best_eval or best_move is None:
+                best_eval, best_move = evaluation, move
+            beta = min(beta, evaluation)
+            if alpha > beta:
+                if stats is not None:
+                    stats.cutoffs += 1
+                if ordering is not None:
+                    ordering.cutoff(move, ply, depth)
+                break
+
+    if tt is not None and best_move is not None:
+        if best_eval < alpha_start:
+            flag = UPPER
+        elif best_eval > beta_start:
+            flag = LOWER
+        else:
+            flag = EXACT
+        tt.store(key, depth, best_eval, flag, (best_move.start, best_move.end))
+    return best_eval
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search when its deadline has passed or it has been stopped."""
+
+
+def iterative_deepening(board, max_player, time_budget_ms, game=None, max_depth=64, ordering=None, stats=None,
+                        tt=None, stop=None, evaluator=None, tablebase=None, start=None, move_cache=None):
+    """
+    Search one ply deeper at a time until the time budget runs out.
+    The principal variation of every completed iteration is searched first in the next one.
+    Depth 1 is always completed, so a move is returned even with a tiny budget.
+    :param board: the board to search; it is restored to its original position on return.
+    :param max_player: if True, we're the maximizing player; otherwise, minimizing.
+    :param time_budget_ms: the wall-clock budget of the whole search, in milliseconds.
+    :param game: the game object.
+    :param max_depth: the depth at which to stop even if time is left.
+    :param ordering: an optional MoveOrdering.
+    :param stats: an optional SearchStats to collect counters and timings, with one iteration per depth.
+    :param tt: an optional TranspositionTable; a temporary one is used if None.
+    :param stop: an optional threading.Event that ends the search early, like running out of time.
+    :param evaluator: an optional Evaluator used instead of board.evaluate.
+    :param tablebase: an optional Tablebase to score the positions it covers.
+    :param start: an optional (value, Move, depth) of a search of the same position already completed,
+        e.g. while pondering, with its results in tt; deepening resumes from the next depth.
+    :param move_cache: an optional MoveCache, kept by the caller from one search to the next.
+    :return: the game value and the best Move of the deepest completed iteration, and that depth.
+    """
+    deadline = time.perf_counter() + time_budget_ms / 1000
+    if tt is None:
+        tt = TranspositionTable(4)
+
+    if start is None:
+        value, move = alphabeta(board, 1, max_player, game, ordering, stats, tt, evaluator=evaluator,
+                                tablebase=tablebase, move_cache=move_cache)
+        completed = 1
+    else:
+        value, move, completed = start
+    pv = principal_variation(board, max_player, tt, completed)
+    for depth in range(completed + 1, max_depth + 1):
+        if move is None or time.perf_counter() > deadline or (stop is not None and stop.is_set()):
+            break
+        try:
+            value, move = alphabeta(board, depth, max_player, game, ordering, stats, tt, pv, deadline, stop,
+                                    evaluator, tablebase, move_cache)
+        except SearchTimeout:
+            break
+        completed = depth
+        pv = principal_variation(board, max_player, tt, completed)
+    return value, move, completed
+
+
+def principal_variation(board, max_player, tt, depth):
+    """Follow the best moves stored in the transposition table, as a list of (start, end)."""
+    pv = []
+    made = []
+    for _ in range(depth):
+        entry = tt.peek(position_hash(board, max_player))
+        if entry is None or entry[3] is None:
+            break
+        move = next((m for m in get_move_list(board, WHITE if max_player else DARK_RED)
+                     if (m.start, m.end) == entry[3]), None)
+        if move is None:
+            break
+        pv.append(entry[3])
+        make_move(board, move)
+        made.append(move)
+        max_player = not max_player
+    for move in reversed(made):
+        unmake_move(board, move)
+    return pv
+
+
+def _staged_moves(board, color, ordering, ply, first, stats, cache):
+    """
+    Yield the moves of a node in the order the search tries them, generated in stages:
+    the moves in first, then the captures, then the quiet moves, each stage sorted by ordering.
+    The quiet moves are only generated once the search gets past the captures, so a cutoff before that
+    saves generating them. The order is the one of sorting the whole move list, except that the quiet moves
+    are sorted by the killers and history as they stand after the captures have been searched.
+    :param first: (start, end) of the moves to try before all others, the most promising first,
+        e.g. the principal variation and the best move stored in the transposition table.
+    :param cache: an optional MoveCache to take the stages from.
+    """
+    timed = stats is not None and stats.timed
+    if timed:
+        started = time.perf_counter()
+    captures = get_captures(board, color) if cache is None else cache.get_captures(board, color)
+    if ordering is not None:
+        captures = ordering.order(captures, ply)
+    if timed:
+        stats.phases['movegen'] += time.perf_counter() - started
+
+    tried = []
+    for squares in first:
+        if squares in tried:
+            continue
+        move = next((move for move in captures if (move.start, move.end) == squares), None)
+        if move is None and _is_quiet_move(board, color, squares):
+            move = Move(squares[0], squares[1], None)
+        if move is not None:
+            tried.append(squares)
+            yield move
+    for move in captures:
+        if not tried or (move.start, move.end) not in tried:
+            yield move
+
+    if timed:
+        started = time.perf_counter()
+    quiet = get_quiet_moves(board, color) if cache is None else cache.get_quiet_moves(board, color)
+    if ordering is not None:
+        quiet = ordering.order(quiet, ply)
+    if timed:
+        stats.phases['movegen'] += time.perf_counter() - started
+    for move in quiet:
+        if not tried or (move.start, move.end) not in tried:
+            yield move
+
+
+def _is_quiet_move(board, color, squares):
+    """Whether (start, end) is a legal move to a neighbouring square; used to try a stored move before generating."""
+    (start_row, start_col), (end_row, end_col) = squares
+    if abs(end_row - start_row) != 1 or abs(end_col - start_col) != 1 or not 0 <= end_row < ROWS or \
+            not 0 <= end_col < COLS:
+        return False
+    piece = board.get_piece(start_row, start_col)
+    return piece is not None and piece.color == color and board.get_piece(end_row, end_col) is None
+
+
+def _best_first(moves, best):
+    """Move the move matching best, a (start, end) pair, to the front of moves."""
+    for i, move in enumerate(moves):
+        if (move.start, move.end) == best:
+            return [move] + moves[:i] + moves[i + 1:]
     return moves
+
+
+def get_move_list(board, color):
+    """Get the Moves of all pieces of a given color, in the same order as get_all_moves."""
+    return list(map(Move._make, board.get_moves(color)))
+
+
+def get_captures(board, color):
+    """Get the Moves of a given color that jump, in the same order as get_move_list."""
+    return [Move(start, end, skip) for start, end, skip in board.get_captures(color)]
+
+
+def get_quiet_moves(board, color):
+    """Get the Moves of a given color that do not jump, in the same order as get_move_list."""
+    return [Move(start, end, None) for start, end in board.get_quiet_moves(color)]
+
+
+def make_move(board, move):
+    """Apply a Move to the board in place."""
+    board.play(*move)
+
+
+def unmake_move(board, move):
+    """Revert a Move previously applied by make_move."""
+    board.play(move.start, move.end, move.skip, True)
@@ -0,0 +1,160 @@
+import mmap
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from checkers.bitboard import BitBoard, square_of, row_col
+from checkers.constants import WHITE, DARK_RED
+from checkers.zobrist import position_hash
+from .algorithm import MoveOrdering, alphabeta, get_move_list, make_move
+from .transposition import TranspositionTable
+
+# Opening book file layout (all little-endian):
+#   MAGIC, then the number of slots as uint32 (a power of two),
+#   then the slots, each one (position hash, start square, end square, search depth, value) as
+#   uint64, uint8, uint8, uint8, a pad byte and float32. Empty slots have a zero hash.
+# A position is found at slot hash % slots or one of the slots after it (linear probing).
+MAGIC = b'CKOB'
+_HEADER = struct.Struct('<4sI')
+_SLOT = struct.Struct('<QBBBxf')
+
+
+class OpeningBook:
+    """
+    Read-only access to an opening book file through mmap.
+    A lookup reads a few slots of the file, so it costs next to nothing compared with a search.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.slots = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError('Not an opening book file: {}'.format(path))
+
+    def __getstate__(self):
+        # Worker processes reopen the file rather than pickling the mapping.
+        return self.path
+
+    def __setstate__(self, path):
+        self.__init__(path)
+
+    def __len__(self):
+        return sum(1 for slot in range(self.slots) if self._read(slot)[0])
+
+    def _read(self, slot):
+        return _SLOT.unpack_from(self._mmap, _HEADER.size + slot * _SLOT.size)
+
+    def lookup(self, board, max_player):
+        """
+        Look up the book move of a Board or BitBoard.
+        :return: (value, Move, depth of the search that chose it) like iterative_deepening,
+            or None if the position is not in the book.
+        """
+        key = position_hash(board, max_player)
+        mask = self.slots - 1
+        slot = key & mask
+        while True:
+            found, start, end, depth, value = self._read(slot)
+            if found == 0:
+                return None
+            if found == key:
+                break
+            slot = (slot + 1) & mask
+
+        # The move is stored as two squares; hand back the full Move so its jumped pieces are right.
+        start, end = row_col(start), row_col(end)
+        for move in get_move_list(board, WHITE if max_player else DARK_RED):
+            if move.start == start and move.end == end:
+                return value, move, depth
+        return None
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+def book_positions(plies):
+    """
+    Get every position reachable from the start within fewer than plies plies, red moving first.
+    :return: (BitBoard, max_player) pairs, each position once however many move orders reach it.
+    """
+    positions = {}
+    layer = [(BitBoard(), False)]
+    for ply in range(plies):
+        next_layer = []
+        for board, max_player in layer:
+            key = position_hash(board, max_player)
+            if key in positions:
+                continue
+            positions[key] = (board, max_player)
+            for move in get_move_list(board, WHITE if max_player else DARK_RED):
+                child = board.copy()
+                make_move(child, move)
+                next_layer.append((child, not max_player))
+        layer = next_layer
+    return list(positions.values())
+
+
+# Per-process search state of the build workers, set up by _init_worker.
+# Neighbouring book positions share most of their trees, so the table is kept from one position to the next.
+_ordering = None
+_tt = None
+_evaluator = None
+
+
+def _init_worker(tt_size_mb, evaluator):
+    global _ordering, _tt, _evaluator
+    _ordering = MoveOrdering()
+    _tt = TranspositionTable(tt_size_mb)
+    _evaluator = evaluator
+
+
+def _search_position(board, max_player, depth):
+    value, move = alphabeta(board, depth, max_player, ordering=_ordering, tt=_tt, evaluator=_evaluator)
+    return position_hash(board, max_player), move, value
+
+
+def build(path, plies, depth, processes=None, tt_size_mb=16, evaluator=None, progress=None):
+    """
+    Search every position within plies plies of the start to depth and write the chosen moves to path.
+    :param processes: the number of worker processes searching positions side by side, by default one per CPU.
+    :param evaluator: an optional Evaluator for the searches, see alphabeta.
+    :param progress: an optional callable receiving (positions searched, positions in total).
+    """
+    positions = book_positions(plies)
+    entries = []
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(tt_size_mb, evaluator)) as executor:
+        futures = [executor.submit(_search_position, board, max_player, depth) for board, max_player in positions]
+        for done, future in enumerate(futures, 1):
+            key, move, value = future.result()
+            if move is not None:
+                entries.append((key, move, value))
+            if progress is not None:
+                progress(done, len(positions))
+    write(path, entries, depth)
+    return len(entries)
+
+
+def write(path, entries, depth):
+    """
+    Write an opening book.
+    :param entries: (position hash, Move, value) for every position of the book.
+    :param depth: the search depth the moves were chosen at.
+    """
+    # Keep the table at most half full, so lookups of missing positions stop after a few slots.
+    slots = 1
+    while slots < 2 * len(entries):
+        slots <<= 1
+    mask = slots - 1
+    table = [None] * slots
+    for key, move, value in entries:
+        slot = key & mask
+        while table[slot] is not None and table[slot][0] != key:
+            slot = (slot + 1) & mask
+        table[slot] = (key, square_of(*move.start), square_of(*move.end), depth, value)
+
+    empty = _SLOT.pack(0, 0, 0, 0, 0.0)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, slots))
+        for entry in table:
+            f.write(empty if entry is None else _SLOT.pack(*entry))
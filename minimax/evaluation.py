@@ -0,0 +1,139 @@
+import numpy as np
+from checkers.bitboard import BitBoard, DIRECTIONS, FULL, SQUARES, row_col, square_of
+from checkers.constants import WHITE
+
+# Features are measured for white minus the same measure for red, so higher is better for white (the AI).
+# This ruleset has no kings, hence no king feature.
+FEATURES = ('material', 'advancement', 'center', 'back_rank', 'mobility')
+DEFAULT_WEIGHTS = {
+    'material': 1.0,
+    'advancement': 0.02,
+    'center': 0.05,
+    'back_rank': 0.05,
+    'mobility': 0.01,
+}
+
+_BIT_SHIFTS = np.arange(SQUARES, dtype=np.uint64)
+_ROWS = np.array([row_col(square)[0] for square in range(SQUARES)], dtype=np.float64)
+_COLS = np.array([row_col(square)[1] for square in range(SQUARES)], dtype=np.float64)
+# White starts at the top and moves down the rows, red starts at the bottom and moves up.
+_WHITE_ADVANCE = _ROWS
+_RED_ADVANCE = 7 - _ROWS
+_CENTER = ((_ROWS >= 2) & (_ROWS <= 5) & (_COLS >= 2) & (_COLS <= 5)).astype(np.float64)
+_WHITE_BACK = (_ROWS == 0).astype(np.float64)
+_RED_BACK = (_ROWS == 7).astype(np.float64)
+
+_FULL = np.uint64(FULL)
+_DIRECTIONS = [(np.uint64(even_mask), even_shift, np.uint64(odd_mask), odd_shift)
+               for even_mask, even_shift, odd_mask, odd_shift in DIRECTIONS]
+
+
+def _shift(bits, direction):
+    """Vectorized checkers.bitboard.shift over an array of bitboards."""
+    even_mask, even_shift, odd_mask, odd_shift = direction
+    even = bits & even_mask
+    odd = bits & odd_mask
+    even = even << np.uint64(even_shift) if even_shift > 0 else even >> np.uint64(-even_shift)
+    odd = odd << np.uint64(odd_shift) if odd_shift > 0 else odd >> np.uint64(-odd_shift)
+    return (even | odd) & _FULL
+
+
+def _popcount(bits):
+    """Count the set bits of every 32-bit value in an array."""
+    bits = bits - ((bits >> np.uint64(1)) & np.uint64(0x55555555))
+    bits = (bits & np.uint64(0x33333333)) + ((bits >> np.uint64(2)) & np.uint64(0x33333333))
+    bits = (bits + (bits >> np.uint64(4))) & np.uint64(0x0F0F0F0F)
+    return ((bits * np.uint64(0x01010101)) & _FULL) >> np.uint64(24)
+
+
+def _mobility(own, opponent, empty):
+    """Count the quiet moves and single jumps available to own."""
+    count = np.zeros(own.shape, dtype=np.uint64)
+    for direction in _DIRECTIONS:
+        step = _shift(own, direction)
+        count += _popcount(step & empty)
+        count += _popcount(_shift(step & opponent, direction) & empty)
+    return count.astype(np.float64)
+
+
+def extract_features(white, red):
+    """
+    Compute the features of many positions at once.
+    :param white: array of the white bitboards of the positions.
+    :param red: array of the red bitboards, in the same order.
+    :return: an (N, len(FEATURES)) array.
+    """
+    white = np.asarray(white, dtype=np.uint64)
+    red = np.asarray(red, dtype=np.uint64)
+    white_bits = ((white[:, None] >> _BIT_SHIFTS) & np.uint64(1)).astype(np.float64)
+    red_bits = ((red[:, None] >> _BIT_SHIFTS) & np.uint64(1)).astype(np.float64)
+    empty = ~(white | red) & _FULL
+
+    features = np.empty((len(white), len(FEATURES)), dtype=np.float64)
+    features[:, 0] = white_bits.sum(axis=1) - red_bits.sum(axis=1)
+    features[:, 1] = white_bits @ _WHITE_ADVANCE - red_bits @ _RED_ADVANCE
+    features[:, 2] = (white_bits - red_bits) @ _CENTER
+    features[:, 3] = white_bits @ _WHITE_BACK - red_bits @ _RED_BACK
+    features[:, 4] = _mobility(white, red, empty) - _mobility(red, white, empty)
+    return features
+
+
+def to_bitboards(board):
+    """Get the (white, red) bitboards of a Board or BitBoard."""
+    if not isinstance(board, BitBoard):
+        board = BitBoard.from_board(board)
+    return board.white, board.red
+
+
+def child_bitboards(white, red, moves, color):
+    """
+    Get the (white, red) bitboards reached by each of moves, without making them.
+    :param moves: Moves of the pieces of color.
+    :return: two lists, in the order of moves.
+    """
+    whites, reds = [], []
+    for move in moves:
+        path = (1 << square_of(*move.start)) | (1 << square_of(*move.end))
+        captured = 0
+        if move.skip:
+            for piece in move.skip:
+                captured |= 1 << square_of(piece.row, piece.col)
+        if color == WHITE:
+            whites.append(white ^ path)
+            reds.append(red & ~captured)
+        else:
+            whites.append(white & ~captured)
+            reds.append(red ^ path)
+    return whites, reds
+
+
+class Evaluator:
+    """
+    Weighted position evaluation over FEATURES, scored with NumPy for many positions at once.
+    With only the material weight set, it gives the same values as Board.evaluate.
+    """
+
+    def __init__(self, weights=None):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights:
+            unknown = set(weights) - set(FEATURES)
+            if unknown:
+                raise ValueError('Unknown evaluation features: {}'.format(', '.join(sorted(unknown))))
+            self.weights.update(weights)
+        self._vector = np.array([self.weights[name] for name in FEATURES], dtype=np.float64)
+
+    def evaluate_batch(self, white, red):
+        """Score positions given as arrays of white and red bitboards."""
+        if len(white) == 0:
+            return np.empty(0, dtype=np.float64)
+        return extract_features(white, red) @ self._vector
+
+    def evaluate_children(self, board, moves, color):
+        """Score the positions reached by each of moves of the pieces of color, without making them."""
+        white, red = to_bitboards(board)
+        return self.evaluate_batch(*child_bitboards(white, red, moves, color))
+
+    def evaluate(self, board):
+        """Score a single Board or BitBoard."""
+        white, red = to_bitboards(board)
+        return float(self.evaluate_batch([white], [red])[0])
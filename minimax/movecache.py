@@ -0,0 +1,78 @@
+from collections import OrderedDict
+from checkers.bitboard import BitBoard
+from checkers.constants import WHITE
+from checkers.zobrist import position_hash
+from .algorithm import get_captures, get_quiet_moves
+
+
+class MoveCache:
+    """
+    Least-recently-used cache of the Moves of whole positions, keyed by position hash.
+    A search comes back to the same positions at every iteration of iterative deepening and through
+    transpositions; their moves then cost a dict lookup instead of a generation.
+    The captures and the quiet moves of a position are kept apart, as the search generates them in
+    stages: the quiet moves are only generated, and cached, once a search needs them.
+
+    Only BitBoard positions are cached: the Moves of a BitBoard hold pieces of their own, while those of
+    a Board hold the pieces standing on it, which move during a search. Board caches the moves of each
+    of its pieces itself, see Board.get_valid_moves.
+    """
+
+    def __init__(self, size=1 << 16):
+        """:param size: the number of positions kept before the least recently used ones are dropped."""
+        self.size = size
+        self._positions = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._positions)
+
+    def get_captures(self, board, color):
+        """Get the Moves of a given color that jump, like get_captures; the list must not be modified."""
+        if not isinstance(board, BitBoard):
+            return get_captures(board, color)
+        key = position_hash(board, color == WHITE)
+        entry = self._positions.get(key)
+        if entry is not None:
+            self._positions.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        # [captures, quiet moves or None until they are asked for]
+        entry = self._positions[key] = [get_captures(board, color), None]
+        if len(self._positions) > self.size:
+            self._positions.popitem(last=False)
+            self.evictions += 1
+        return entry[0]
+
+    def get_quiet_moves(self, board, color):
+        """
+        Get the Moves of a given color that do not jump, like get_quiet_moves; the list must not be modified.
+        Only cached for the positions whose captures were asked for first, as the search does.
+        """
+        entry = self._positions.get(position_hash(board, color == WHITE)) if isinstance(board, BitBoard) else None
+        if entry is None:
+            return get_quiet_moves(board, color)
+        if entry[1] is None:
+            entry[1] = get_quiet_moves(board, color)
+        return entry[1]
+
+    def clear(self):
+        self._positions.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_stats(self):
+        """Get the hit/miss statistics of the cache."""
+        return {
+            'size': self.size,
+            'positions': len(self._positions),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'evictions': self.evictions,
+        }
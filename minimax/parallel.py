@@ -0,0 +1,116 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from checkers.bitboard import BitBoard
+from .algorithm import WHITE, DARK_RED, MoveOrdering, SearchStats, get_move_list, make_move, unmake_move, _alphabeta
+from .movecache import MoveCache
+from .transposition import SharedTranspositionTable
+
+# Per-process state, set up once in every worker by _init_worker.
+_bound = None
+_ordering = None
+_tt = None
+_evaluator = None
+_tablebase = None
+_move_cache = None
+
+
+def _init_worker(bound, tt, evaluator, tablebase):
+    global _bound, _ordering, _tt, _evaluator, _tablebase, _move_cache
+    _bound = bound
+    _ordering = MoveOrdering()
+    _tt = tt
+    _move_cache = MoveCache()
+    _evaluator = evaluator
+    _tablebase = tablebase
+
+
+def _search_root_move(board, index, depth, max_player):
+    """
+    Search one root move in a worker process.
+    The best value found so far by any worker is shared as a best-effort bound: it is read when
+    the move starts and raised when the move beats it. Every value written was actually reached,
+    so a stale bound only costs pruning, never correctness.
+    :return: the value of the move, exact if it is at least as good as the bound, and the visited nodes.
+    """
+    move = get_move_list(board, WHITE if max_player else DARK_RED)[index]
+    stats = SearchStats()
+    if max_player:
+        alpha, beta = _bound.value, float('inf')
+    else:
+        alpha, beta = float('-inf'), _bound.value
+
+    make_move(board, move)
+    value = _alphabeta(board, depth - 1, not max_player, alpha, beta, 1, _ordering, stats, _tt, None, None, None,
+                       _evaluator, _tablebase, _move_cache)
+    unmake_move(board, move)
+
+    if (max_player and value > _bound.value) or (not max_player and value < _bound.value):
+        _bound.value = value
+    return value, stats.nodes
+
+
+class ParallelSearch:
+    """
+    Search the root moves of a position in parallel on a pool of worker processes.
+    Workers receive a BitBoard, which pickles to a few integers and needs no pygame.
+    Moves that can still tie with the best one are always searched exactly,
+    so ties are broken like alphabeta breaks them.
+    The workers share one SharedTranspositionTable, so the positions reached through several root moves
+    are searched once for all of them; each keeps its own MoveOrdering and MoveCache between searches.
+    """
+
+    def __init__(self, processes=None, tt_size_mb=16, evaluator=None, tablebase=None):
+        """
+        :param tablebase: an optional Tablebase; every worker maps the same file, sharing its pages.
+        """
+        self.processes = processes or os.cpu_count()
+        self.evaluator = evaluator
+        self._bound = multiprocessing.RawValue('d', 0.0)
+        self.tt = SharedTranspositionTable(tt_size_mb)
+        self._executor = ProcessPoolExecutor(self.processes, initializer=_init_worker,
+                                             initargs=(self._bound, self.tt, evaluator, tablebase))
+
+    def search(self, board, depth, max_player, stats=None):
+        """
+        Search board to depth.
+        :param stats: an optional SearchStats to count the nodes visited by all workers.
+        :return: the game value and the best Move of board, or None if there is no move to make.
+        """
+        if stats is not None:
+            stats.nodes += 1
+        if depth == 0 or board.get_winner() is not None:
+            return (board.evaluate() if self.evaluator is None else self.evaluator.evaluate(board)), None
+
+        moves = get_move_list(board, WHITE if max_player else DARK_RED)
+        snapshot = board if isinstance(board, BitBoard) else BitBoard.from_board(board)
+        self._bound.value = float('-inf') if max_player else float('inf')
+
+        # Send the most promising moves first, so that a good bound is shared early.
+        order = MoveOrdering().order(moves, 0)
+        index = {id(move): i for i, move in enumerate(moves)}
+        futures = [(index[id(move)], self._executor.submit(_search_root_move, snapshot, index[id(move)], depth,
+                                                            max_player))
+                   for move in order]
+
+        best_eval = float('-inf') if max_player else float('inf')
+        best_index = None
+        for i, future in futures:
+            evaluation, nodes = future.result()
+            if stats is not None:
+                stats.nodes += nodes
+            # Ties go to the last generated move, as in minimax.
+            if evaluation == best_eval and best_index is not None and i < best_index:
+                continue
+            if (max_player and evaluation >= best_eval) or (not max_player and evaluation <= best_eval):
+                best_eval, best_index = evaluation, i
+        return best_eval, moves[best_index] if best_index is not None else None
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,75 @@
+import sys
+import time
+
+
+class StackProfiler:
+    """
+    Deterministic profile of the code run inside it, by call stack, for flame graphs:
+
+        with StackProfiler() as profiler:
+            alphabeta(board, 6, True)
+        with open('search.folded', 'w') as f:
+            profiler.write_collapsed(f)
+
+    Every call and return is seen through sys.setprofile, so the time spent in each function is charged
+    to the exact stack it was called from, recursion included. The hook slows the code down several times;
+    the time it spends in itself is left out, but take the shape of the profile rather than its durations
+    as they are. Only the thread entering it is profiled.
+    """
+
+    def __init__(self, builtins=True):
+        """
+        :param builtins: show the functions implemented in C, such as sorted or list.append, as frames of their own;
+            otherwise their time is charged to their callers.
+        """
+        self.builtins = builtins
+        # Tuple of frame names from the outermost call -> seconds spent in the innermost one itself.
+        self.stacks = {}
+        self._names = {}
+        self._keys = None
+        self._last = 0.0
+
+    def __enter__(self):
+        self._keys = [()]
+        self._last = time.perf_counter()
+        sys.setprofile(self._hook)
+        return self
+
+    def __exit__(self, *exc_info):
+        sys.setprofile(None)
+
+    def _hook(self, frame, event, arg):
+        now = time.perf_counter()
+        keys = self._keys
+        key = keys[-1]
+        self.stacks[key] = self.stacks.get(key, 0.0) + now - self._last
+        if event == 'call':
+            code = frame.f_code
+            name = self._names.get(code)
+            if name is None:
+                name = self._names[code] = '{}:{}'.format(frame.f_globals.get('__name__', '?'),
+                                                         getattr(code, 'co_qualname', code.co_name))
+            keys.append(key + (name,))
+        elif event == 'c_call':
+            if self.builtins:
+                keys.append(key + ('{}:{}'.format(getattr(arg, '__module__', None) or 'builtins',
+                                                  getattr(arg, '__qualname__', None) or repr(arg)),))
+        elif event == 'return' or self.builtins:
+            # return, c_return or c_exception; the calls made before entering never pop past the root.
+            if len(keys) > 1:
+                keys.pop()
+        self._last = time.perf_counter()
+
+    def total(self):
+        """Get the seconds profiled, in all stacks."""
+        return sum(self.stacks.values())
+
+    def write_collapsed(self, file):
+        """
+        Write the profile in the collapsed stack format of flamegraph.pl, speedscope and inferno:
+        one line per stack, its frames from the outermost joined by ';', then its own time in microseconds.
+        """
+        for key, seconds in sorted(self.stacks.items()):
+            microseconds = round(seconds * 1e6)
+            if key and microseconds:
+                file.write('{} {}\n'.format(';'.join(key), microseconds))
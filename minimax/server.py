@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from checkers.bitboard import BitBoard
+from checkers.constants import WHITE
+from checkers.fen import parse_fen
+from .algorithm import MoveOrdering, alphabeta, iterative_deepening
+from .movecache import MoveCache
+from .transposition import SharedTranspositionTable
+
+# Engine server protocol: newline-delimited JSON over TCP, any number of requests in flight per connection.
+#   request:  {"id": any, "fen": "W:W1,2:B30", "time_ms": 100} or {"id": any, "fen": ..., "depth": 4}
+#   response: {"id": any, "start": [row, col], "end": [row, col], "captured": [[row, col], ...],
+#              "value": float, "depth": int, "source": "book" or "search"}
+#             with "start": null if the side to move has no move, or
+#             {"id": any, "error": "busy"} when the queue is full, or {"id": any, "error": message}.
+# Responses may come back in a different order than the requests; match them by id.
+MAX_TIME_MS = 10000
+MAX_DEPTH = 12
+
+# Per-process search state of the workers, set up by _init_worker.
+_ordering = None
+_tt = None
+_evaluator = None
+_tablebase = None
+_move_cache = None
+
+
+def _init_worker(tt, evaluator, tablebase):
+    global _ordering, _tt, _evaluator, _tablebase, _move_cache
+    _ordering = MoveOrdering()
+    _move_cache = MoveCache()
+    _tt = tt
+    _evaluator = evaluator
+    _tablebase = tablebase
+
+
+def _search_batch(requests):
+    """Search a batch of (fen, time_ms, depth) in a worker and return (value, Move, depth) for each."""
+    results = []
+    for fen, time_ms, depth in requests:
+        turn, white, red = parse_fen(fen)
+        board = BitBoard.from_fen(fen)
+        if time_ms > 0:
+            results.append(iterative_deepening(board, turn == WHITE, time_ms, ordering=_ordering, tt=_tt,
+                                               evaluator=_evaluator, tablebase=_tablebase, move_cache=_move_cache))
+        else:
+            value, move = alphabeta(board, depth, turn == WHITE, ordering=_ordering, tt=_tt, evaluator=_evaluator,
+                                    tablebase=_tablebase, move_cache=_move_cache)
+            results.append((value, move, depth))
+    return results
+
+
+class EngineServer:
+    """
+    Serve best moves to many concurrent games from one process pool.
+    The workers share one SharedTranspositionTable; the opening book is looked up before queueing,
+    so book positions are answered at once. Under load, queued requests are handed to the workers
+    in batches, so a burst of short searches costs a few round trips to the pool rather than one each.
+    """
+
+    def __init__(self, processes=None, tt_size_mb=64, book=None, tablebase=None, evaluator=None, queue_size=256,
+                 batch_size=8):
+        """
+        :param book: an optional OpeningBook.
+        :param tablebase: an optional Tablebase; every worker maps the same file.
+        :param queue_size: the number of requests waiting for a worker beyond which new ones are refused as busy.
+        """
+        self.book = book
+        self.batch_size = batch_size
+        self.processes = processes or os.cpu_count()
+        self.tt = SharedTranspositionTable(tt_size_mb)
+        self._executor = ProcessPoolExecutor(self.processes, initializer=_init_worker,
+                                             initargs=(self.tt, evaluator, tablebase))
+        self._queue_size = queue_size
+        self._queue = None
+        self._server = None
+        self._dispatcher = None
+        self._connections = {}
+        self.served = self.rejected = self.book_hits = self.batches = 0
+
+    async def start(self, host='127.0.0.1', port=8765):
+        """Start listening; the port actually used is in self.port (pass 0 to pick a free one)."""
+        self._queue = asyncio.Queue(self._queue_size)
+        self._dispatcher = asyncio.ensure_future(self._dispatch())
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        # Hang up on the clients still connected, and let their handlers finish.
+        for writer in self._connections.values():
+            writer.close()
+        if self._connections:
+            await asyncio.wait(list(self._connections))
+        await self._server.wait_closed()
+        self._dispatcher.cancel()
+        self._executor.shutdown(cancel_futures=True)
+
+    async def _handle(self, reader, writer):
+        """Read the requests of one connection and answer each as soon as it is done."""
+        pending = set()
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._answer(line, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.wait(pending)
+        except ConnectionError:
+            pass
+        finally:
+            for task in pending:
+                task.cancel()
+            del self._connections[asyncio.current_task()]
+            writer.close()
+
+    async def _answer(self, line, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            response = await self._request(request)
+        except Exception as e:
+            # A bad request, or a search that failed in a worker; the connection and the server carry on.
+            response = {'error': str(e) or type(e).__name__}
+        response['id'] = request_id
+        if writer.is_closing():
+            # The client hung up, or the server is closing, while the request was searched.
+            return
+        writer.write(json.dumps(response).encode() + b'\n')
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _request(self, request):
+        fen = request['fen']
+        time_ms = int(request.get('time_ms', 0))
+        depth = int(request.get('depth', 0))
+        # Each field given must be in range on its own: the worker searches by time_ms whenever it is set.
+        if 'time_ms' in request and not 0 < time_ms <= MAX_TIME_MS:
+            raise ValueError('Give time_ms from 1 up to {}'.format(MAX_TIME_MS))
+        if 'depth' in request and not 0 < depth <= MAX_DEPTH:
+            raise ValueError('Give depth from 1 up to {}'.format(MAX_DEPTH))
+        if not time_ms and not depth:
+            raise ValueError('Give time_ms up to {} or depth up to {}'.format(MAX_TIME_MS, MAX_DEPTH))
+        turn, white, red = parse_fen(fen)
+
+        if self.book is not None:
+            found = self.book.lookup(BitBoard.from_fen(fen), turn == WHITE)
+            if found is not None:
+                self.book_hits += 1
+                self.served += 1
+                return _response(found, 'book')
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(((fen, time_ms, depth), future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return {'error': 'busy'}
+        result = await future
+        self.served += 1
+        return _response(result, 'search')
+
+    async def _dispatch(self):
+        """
+        Hand queued requests to the workers, with at most one batch per worker at a time.
+        A batch takes the worker's share of the backlog, up to batch_size: requests only wait
+        behind each other in a batch when they would have waited in the queue anyway.
+        """
+        loop = asyncio.get_running_loop()
+        workers = asyncio.Semaphore(self.processes)
+        while True:
+            await workers.acquire()
+            batch = [await self._queue.get()]
+            size = min(self.batch_size, -(-(self._queue.qsize() + 1) // self.processes))
+            while len(batch) < size:
+                batch.append(self._queue.get_nowait())
+            self.batches += 1
+            done = loop.run_in_executor(self._executor, _search_batch, [request for request, future in batch])
+            done.add_done_callback(lambda done, batch=batch: (workers.release(), _settle(batch, done)))
+
+    def get_stats(self):
+        return {
+            'served': self.served,
+            'rejected': self.rejected,
+            'book_hits': self.book_hits,
+            'batches': self.batches,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+def _settle(batch, done):
+    """Pass the results of a finished batch on to the requests waiting for them."""
+    for i, (request, future) in enumerate(batch):
+        if future.cancelled():
+            continue
+        if done.cancelled():
+            # The pool was shut down before the batch ran.
+            future.cancel()
+        elif done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result()[i])
+
+
+def _response(result, source):
+    value, move, depth = result
+    if move is None:
+        return {'start': None, 'end': None, 'captured': [], 'value': value, 'depth': depth, 'source': source}
+    return {
+        'start': list(move.start),
+        'end': list(move.end),
+        'captured': [[piece.row, piece.col] for piece in move.skip or ()],
+        'value': float(value),
+        'depth': depth,
+        'source': source,
+    }
@@ -0,0 +1,238 @@
+import mmap
+import struct
+from array import array
+from itertools import combinations
+from math import comb
+from checkers.bitboard import BitBoard, SQUARES, iter_squares
+from checkers.constants import WHITE, DARK_RED
+from .algorithm import get_move_list
+
+# Endgame tablebase file layout (all little-endian):
+#   MAGIC, then max_pieces and the number of tables as two uint16,
+#   then one (white pieces, red pieces, offset) directory entry per table as uint16, uint16, uint64,
+#   then the tables. A table holds one int16 per (white squares, red squares, side to move) index, see _index.
+# Values are from the side to move: 0 is a draw, d > 0 a win in d plies, -(d + 1) a loss in d plies.
+MAGIC = b'CKTB'
+_HEADER = struct.Struct('<4sHH')
+_ENTRY = struct.Struct('<HHQ')
+
+WIN, LOSS, DRAW = 1, -1, 0
+
+# Search score of a won position, minus the plies it takes to win.
+WIN_SCORE = 1000
+
+
+def _rank(bits):
+    """Rank a set of squares among the sets of the same size (combinatorial number system)."""
+    rank = 0
+    for i, square in enumerate(iter_squares(bits), 1):
+        rank += comb(square, i)
+    return rank
+
+
+def _index(white, red, white_to_move, red_count):
+    return ((_rank(white) * comb(SQUARES, red_count) + _rank(red)) << 1) | (0 if white_to_move else 1)
+
+
+def _table_size(white_count, red_count):
+    return comb(SQUARES, white_count) * comb(SQUARES, red_count) * 2
+
+
+def _materials(max_pieces):
+    """Get the (white pieces, red pieces) of every table, fewest pieces first."""
+    return [(w, total - w) for total in range(2, max_pieces + 1) for w in range(1, total)]
+
+
+def decode(value):
+    """Turn a stored value into (WIN, LOSS or DRAW, distance in plies)."""
+    if value > 0:
+        return WIN, value
+    if value < 0:
+        return LOSS, -value - 1
+    return DRAW, 0
+
+
+class Tablebase:
+    """
+    Read-only access to a tablebase file through mmap.
+    Nothing is loaded up front and every probe is a single lookup, so processes that open
+    the same file share its pages through the OS page cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.max_pieces, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a tablebase file: {}'.format(path))
+        self._offsets = {}
+        for i in range(count):
+            white_count, red_count, offset = _ENTRY.unpack_from(self._mmap, _HEADER.size + i * _ENTRY.size)
+            self._offsets[(white_count, red_count)] = offset
+
+    def __getstate__(self):
+        # Worker processes reopen the file rather than pickling the mapping.
+        return self.path
+
+    def __setstate__(self, path):
+        self.__init__(path)
+
+    def covers(self, white_count, red_count):
+        return (white_count, red_count) in self._offsets
+
+    def probe(self, white, red, white_to_move):
+        """
+        Look up a position given as white and red bitboards.
+        :return: (WIN, LOSS or DRAW for the side to move, distance in plies), or None if it is not in the tablebase.
+        """
+        white_count, red_count = bin(white).count('1'), bin(red).count('1')
+        offset = self._offsets.get((white_count, red_count))
+        if offset is None:
+            return None
+        index = _index(white, red, white_to_move, red_count)
+        return decode(struct.unpack_from('<h', self._mmap, offset + index * 2)[0])
+
+    def score(self, board, max_player, ply=0):
+        """
+        Get the search score of a Board or BitBoard from white's point of view, or None if it is not covered.
+        Quicker wins and slower losses score better, counting the ply plies already played from the search root.
+        Finished games are scored on the same scale, so the search never prefers a won table position to winning.
+        """
+        if board.white_left + board.black_left > self.max_pieces:
+            return None
+        if board.white_left == 0 or board.black_left == 0:
+            return WIN_SCORE - ply if board.black_left == 0 else ply - WIN_SCORE
+        if not isinstance(board, BitBoard):
+            board = BitBoard.from_board(board)
+        found = self.probe(board.white, board.red, max_player)
+        if found is None:
+            return None
+        result, distance = found
+        if result == DRAW:
+            return 0
+        score = WIN_SCORE - ply - distance
+        return score if (result == WIN) == max_player else -score
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+def generate(path, max_pieces, progress=None):
+    """
+    Solve every position with up to max_pieces pieces (at least one of each color) by retrograde analysis
+    and write the tablebase to path.
+    :param progress: an optional callable receiving (white pieces, red pieces) before each table is solved.
+    """
+    tables = {}
+    for white_count, red_count in _materials(max_pieces):
+        if progress is not None:
+            progress(white_count, red_count)
+        tables[(white_count, red_count)] = _solve(white_count, red_count, tables)
+
+    materials = _materials(max_pieces)
+    offset = _HEADER.size + len(materials) * _ENTRY.size
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, max_pieces, len(materials)))
+        for white_count, red_count in materials:
+            f.write(_ENTRY.pack(white_count, red_count, offset))
+            offset += _table_size(white_count, red_count) * 2
+        for material in materials:
+            table = tables[material]
+            if table.itemsize != 2:
+                raise RuntimeError('int16 arrays are not 2 bytes on this platform')
+            if struct.pack('=h', 1) != struct.pack('<h', 1):
+                table = array('h', table)
+                table.byteswap()
+            f.write(table.tobytes())
+
+
+def _solve(white_count, red_count, tables):
+    """
+    Solve the positions of one material balance, given the tables of every smaller one.
+    Results are settled in order of distance: a position wins in d plies as soon as one move reaches
+    a loss in d - 1 plies, and loses in d plies once every move reaches a win, the slowest in d - 1 plies.
+    """
+    size = _table_size(white_count, red_count)
+    table = array('h', bytes(2 * size))
+    red_size = comb(SQUARES, red_count)
+
+    positions = []
+    for white_squares in combinations(range(SQUARES), white_count):
+        white = sum(1 << square for square in white_squares)
+        white_rank = _rank(white)
+        for red_squares in combinations([s for s in range(SQUARES) if not white >> s & 1], red_count):
+            red = sum(1 << square for square in red_squares)
+            base = (white_rank * red_size + _rank(red)) << 1
+            positions.append((base, white, red))
+
+    # buckets[d] holds (kind, index) events settled at distance d, where kind is WIN, LOSS
+    # or 0 for one more successor found to be a win for the opponent.
+    buckets = {}
+    remaining = {}
+    escapes = set()
+    predecessors = {}
+    board = BitBoard.__new__(BitBoard)
+    board.hash = 0
+
+    for base, white, red in positions:
+        for white_to_move in (True, False):
+            index = base | (0 if white_to_move else 1)
+            board.white, board.red = white, red
+            board.white_left, board.black_left = white_count, red_count
+            moves = get_move_list(board, WHITE if white_to_move else DARK_RED)
+            if not moves:
+                buckets.setdefault(0, []).append((LOSS, index))
+                continue
+            remaining[index] = len(moves)
+            for move in moves:
+                child = _child(white, red, move, white_to_move)
+                child_white, child_red = child
+                child_counts = (bin(child_white).count('1'), bin(child_red).count('1'))
+                if 0 in child_counts:
+                    buckets.setdefault(1, []).append((WIN, index))
+                elif child_counts == (white_count, red_count):
+                    child_index = _index(child_white, child_red, not white_to_move, red_count)
+                    predecessors.setdefault(child_index, []).append(index)
+                else:
+                    child_index = _index(child_white, child_red, not white_to_move, child_counts[1])
+                    result, distance = decode(tables[child_counts][child_index])
+                    if result == LOSS:
+                        buckets.setdefault(distance + 1, []).append((WIN, index))
+                    elif result == WIN:
+                        buckets.setdefault(distance + 1, []).append((0, index))
+                    else:
+                        escapes.add(index)
+
+    distance = 0
+    while buckets:
+        for kind, index in buckets.pop(distance, ()):
+            if kind == 0:
+                remaining[index] -= 1
+                if remaining[index] == 0 and index not in escapes and table[index] == 0:
+                    _settle(table, index, LOSS, distance, predecessors, buckets)
+            elif table[index] == 0:
+                _settle(table, index, kind, distance, predecessors, buckets)
+        distance += 1
+    return table
+
+
+def _settle(table, index, result, distance, predecessors, buckets):
+    table[index] = distance if result == WIN else -distance - 1
+    kind = WIN if result == LOSS else 0
+    for predecessor in predecessors.get(index, ()):
+        buckets.setdefault(distance + 1, []).append((kind, predecessor))
+
+
+def _child(white, red, move, white_to_move):
+    """Get the (white, red) bitboards after a Move, without making it."""
+    start = 1 << (move.start[0] * 4 + move.start[1] // 2)
+    end = 1 << (move.end[0] * 4 + move.end[1] // 2)
+    captured = 0
+    if move.skip:
+        for piece in move.skip:
+            captured |= 1 << (piece.row * 4 + piece.col // 2)
+    if white_to_move:
+        return white ^ start ^ end, red & ~captured
+    return white & ~captured, red ^ start ^ end
@@ -0,0 +1,221 @@
+import multiprocessing
+import struct
+import sys
+from checkers.bitboard import square_of, row_col
+
+# Bound types of a stored score.
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results indexed by Zobrist hash.
+    Every bucket has two slots: the first keeps the deepest result seen (depth-preferred),
+    the second always takes the newest one, so recent positions are never locked out.
+    """
+    # Memory held by one full slot, measured on a representative entry: the entry tuple, its 64-bit key,
+    # its float score, the best move tuple and its two squares (depth and flag are cached small ints),
+    # plus the slot's pointer in the list.
+    ENTRY_BYTES = sum(sys.getsizeof(part) for part in (
+        (1 << 63, 0, 0.5, EXACT, ((0, 1), (1, 0))), 1 << 63, 0.5, ((0, 1), (1, 0)), (0, 1), (1, 0))) + 8
+
+    def __init__(self, size_mb=16):
+        """Allocate a table that uses at most size_mb megabytes once full, the most slots in a power of two that fit."""
+        buckets = 1
+        while buckets * 4 * self.ENTRY_BYTES <= size_mb * 1024 * 1024:
+            buckets *= 2
+        self.mask = buckets - 1
+        self.size_mb = size_mb
+        self.slots = [None] * (buckets * 2)
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def probe(self, key):
+        """
+        Look up a position.
+        :return: (depth, score, flag, best) stored for key, or None.
+        """
+        index = (key & self.mask) << 1
+        for entry in (self.slots[index], self.slots[index + 1]):
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1:]
+        self.misses += 1
+        return None
+
+    def peek(self, key):
+        """Look up a position like probe, without counting it in the statistics."""
+        index = (key & self.mask) << 1
+        for entry in (self.slots[index], self.slots[index + 1]):
+            if entry is not None and entry[0] == key:
+                return entry[1:]
+        return None
+
+    def store(self, key, depth, score, flag, best=None):
+        """
+        Store the result of a search.
+        :param depth: the depth the position was searched to.
+        :param flag: EXACT, LOWER if score is a lower bound or UPPER if it is an upper bound.
+        :param best: (start, end) of the best move found, if any.
+        """
+        index = (key & self.mask) << 1
+        deepest = self.slots[index]
+        if deepest is None or deepest[0] == key or depth >= deepest[1]:
+            slot = index
+        else:
+            slot = index + 1
+        if self.slots[slot] is not None and self.slots[slot][0] != key:
+            self.overwrites += 1
+        self.slots[slot] = (key, depth, score, flag, best)
+        self.stores += 1
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    @property
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def get_stats(self):
+        """Get the hit/miss statistics of the table."""
+        return {
+            'size_mb': self.size_mb,
+            'slots': len(self.slots),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+        }
+
+
+class SharedTranspositionTable:
+    """
+    A TranspositionTable held in shared memory, so that worker processes searching different games
+    read and extend the same table. It is handed to the workers when they start (e.g. as a process pool
+    initializer argument) and has the same methods as TranspositionTable; hit statistics are per process.
+
+    A slot is three 64-bit words: a check word, the score and the other fields packed together.
+    Processes write without locking; the check word is the key xor the two others, so a slot torn
+    by two processes writing at once fails the check and reads as empty.
+    """
+    SLOT = struct.Struct('<QdQ')
+    # Packed fields: depth (8 bits), flag (8 bits), start and end square of the best move (8 bits each).
+    NO_MOVE = 0xFF
+
+    def __init__(self, size_mb=16):
+        """Allocate a table of about size_mb megabytes of shared memory."""
+        buckets = 1
+        while buckets * 4 * self.SLOT.size <= size_mb * 1024 * 1024:
+            buckets *= 2
+        self.mask = buckets - 1
+        self.size_mb = size_mb
+        self._array = multiprocessing.RawArray('B', buckets * 2 * self.SLOT.size)
+        self._init_local()
+
+    def _init_local(self):
+        self.buffer = memoryview(self._array).cast('B')
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    def __getstate__(self):
+        # Only the shared memory and the size travel to the workers; statistics start over there.
+        return self._array, self.mask, self.size_mb
+
+    def __setstate__(self, state):
+        self._array, self.mask, self.size_mb = state
+        self._init_local()
+
+    def __len__(self):
+        return (self.mask + 1) * 2
+
+    def _read(self, slot):
+        """Get (key, depth, score, flag, best) of a slot, or None if it is empty or torn."""
+        check, score, fields = self.SLOT.unpack_from(self.buffer, slot * self.SLOT.size)
+        if not check and not fields:
+            return None
+        key = check ^ fields ^ _score_bits(score)
+        start, end = fields >> 16 & 0xFF, fields >> 24 & 0xFF
+        best = None if start == self.NO_MOVE else (row_col(start), row_col(end))
+        return key, fields & 0xFF, score, fields >> 8 & 0xFF, best
+
+    def _find(self, key):
+        index = (key & self.mask) << 1
+        for slot in (index, index + 1):
+            entry = self._read(slot)
+            if entry is not None and entry[0] == key:
+                return entry[1:]
+        return None
+
+    def probe(self, key):
+        """
+        Look up a position.
+        :return: (depth, score, flag, best) stored for key, or None.
+        """
+        entry = self._find(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def peek(self, key):
+        """Look up a position like probe, without counting it in the statistics."""
+        return self._find(key)
+
+    def store(self, key, depth, score, flag, best=None):
+        """
+        Store the result of a search.
+        :param depth: the depth the position was searched to.
+        :param flag: EXACT, LOWER if score is a lower bound or UPPER if it is an upper bound.
+        :param best: (start, end) of the best move found, if any.
+        """
+        index = (key & self.mask) << 1
+        deepest = self._read(index)
+        if deepest is None or deepest[0] == key or depth >= deepest[1]:
+            slot = index
+        else:
+            slot = index + 1
+        current = deepest if slot == index else self._read(slot)
+        if current is not None and current[0] != key:
+            self.overwrites += 1
+        if best is None:
+            start = end = self.NO_MOVE
+        else:
+            start, end = square_of(*best[0]), square_of(*best[1])
+        fields = min(depth, 0xFF) | flag << 8 | start << 16 | end << 24
+        score = float(score)
+        self.SLOT.pack_into(self.buffer, slot * self.SLOT.size, key ^ fields ^ _score_bits(score), score, fields)
+        self.stores += 1
+
+    def clear(self):
+        self.buffer[:] = bytes(len(self.buffer))
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    @property
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def get_stats(self):
+        """Get the hit/miss statistics of the table, as seen by this process."""
+        return {
+            'size_mb': self.size_mb,
+            'slots': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+        }
+
+
+_DOUBLE = struct.Struct('<d')
+_WORD = struct.Struct('<Q')
+
+
+def _score_bits(score):
+    return _WORD.unpack(_DOUBLE.pack(score))[0]
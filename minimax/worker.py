@@ -0,0 +1,223 @@
+import threading
+import time
+from checkers.bitboard import BitBoard
+from checkers.constants import WHITE, DARK_RED
+from checkers.zobrist import position_hash
+from .algorithm import SearchStats, SearchTimeout, alphabeta, iterative_deepening, principal_variation, \
+    get_move_list, make_move, _best_first
+from .movecache import MoveCache
+from .transposition import TranspositionTable
+
+
+class SearchWorker:
+    """
+    Run the AI search on a background thread, so the caller's loop keeps running meanwhile.
+    The search works on a BitBoard snapshot of the position, never on the board being drawn.
+
+    While the opponent is to move, ponder searches the positions after each of its replies, the expected one first.
+    Once the opponent has moved, start picks up the work done on the reply actually played and drops the rest.
+    """
+
+    def __init__(self, time_budget_ms, ordering=None, tt=None, evaluator=None, tablebase=None, book=None):
+        """
+        :param book: an optional OpeningBook; positions it holds are played from it without searching.
+        """
+        # Set collect_stats to time every search; the SearchStats of the last one is then kept in stats.
+        self.collect_stats = False
+        self.stats = None
+        self.time_budget_ms = time_budget_ms
+        self.ordering = ordering
+        self.tt = tt
+        self.evaluator = evaluator
+        self.tablebase = tablebase
+        self.book = book
+        # Kept across searches and pondering, which come back to the same positions move after move.
+        self.move_cache = MoveCache()
+        self._thread = None
+        self._stop = None
+        self._result = None
+        # The exception the last search failed with, raised again by poll.
+        self._error = None
+        self._ponder_thread = None
+        self._ponder_stop = None
+        # Hash of the position being pondered, and position hash of each reply -> (value, Move, depth, seconds).
+        self._pondering = None
+        self._pondered = {}
+        # Whether the last search started from the results of pondering.
+        self.ponder_hit = False
+
+    @property
+    def idle(self):
+        """True if no search has been started since the last result was collected."""
+        return self._thread is None
+
+    @property
+    def thinking(self):
+        """True while a search is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, board, max_player):
+        """
+        Start searching the position of board, cancelling any search still running.
+        If the position was reached by a reply that was pondered, the search resumes from the deepest iteration
+        pondering completed, and only uses the rest of the time budget; it answers at once if none is left.
+        """
+        self.cancel_search()
+        snapshot = BitBoard.from_board(board)
+        if self._ponder_thread is not None:
+            self._ponder_stop.set()
+            self._ponder_thread.join()
+        pondered = self._pondered.get(position_hash(snapshot, max_player))
+        self.ponder_hit = pondered is not None and pondered[2] > 0
+        self.stop_pondering()
+        self._stop = threading.Event()
+        stats = SearchStats(timed=True) if self.collect_stats else None
+        self._thread = threading.Thread(target=self._run, args=(snapshot, max_player, self._stop, stats, pondered),
+                                        name='SearchWorker', daemon=True)
+        self._thread.start()
+
+    def _run(self, board, max_player, stop, stats, pondered):
+        try:
+            result = self._search(board, max_player, stop, stats, pondered)
+        except Exception as e:
+            # Kept for poll to raise in the caller's thread, rather than lost with this one.
+            if not stop.is_set():
+                self._error = e
+            return
+        if not stop.is_set():
+            self._result = result
+            self.stats = stats
+
+    def _search(self, board, max_player, stop, stats, pondered):
+        result = self.book.lookup(board, max_player) if self.book is not None else None
+        if result is None:
+            budget_ms, resume = self.time_budget_ms, None
+            if pondered is not None:
+                value, move, depth, seconds = pondered
+                budget_ms -= seconds * 1000
+                if depth:
+                    resume = value, move, depth
+            if budget_ms <= 0 and resume is not None:
+                result = resume
+            else:
+                result = iterative_deepening(board, max_player, budget_ms, ordering=self.ordering, stats=stats,
+                                             tt=self.tt, stop=stop, evaluator=self.evaluator,
+                                             tablebase=self.tablebase, start=resume, move_cache=self.move_cache)
+        return result
+
+    def poll(self):
+        """
+        Collect the result of the search once it is finished.
+        :return: (value, Move, depth) as returned by iterative_deepening, or None if it is still thinking.
+        :raise: the exception the search failed with, if it failed; the worker is then idle again.
+        """
+        if self._thread is None or self._thread.is_alive():
+            return None
+        result, error = self._result, self._error
+        self._thread = self._result = self._error = None
+        if error is not None:
+            raise error
+        return result
+
+    def cancel_search(self):
+        """Stop the running search, if any, and drop its result."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+        self._thread = self._result = self._error = None
+
+    def cancel(self):
+        """Stop the running search and pondering, and drop their results."""
+        self.cancel_search()
+        self.stop_pondering()
+
+    @property
+    def pondering(self):
+        """True while pondering is running."""
+        return self._ponder_thread is not None and self._ponder_thread.is_alive()
+
+    def ponder(self, board, max_player):
+        """
+        Start searching the replies to the position of board, where the opponent of max_player is to move.
+        Pondering goes on until every reply has had the time budget of a search, or until stop_pondering
+        or start is called; pondering the same position again does nothing.
+        """
+        snapshot = BitBoard.from_board(board)
+        key = position_hash(snapshot, not max_player)
+        if self._pondering == key:
+            return
+        self.stop_pondering()
+        if self.tt is None:
+            # The work is passed on to the next search through the table.
+            self.tt = TranspositionTable(4)
+        self._pondering = key
+        self._ponder_stop = threading.Event()
+        self._ponder_thread = threading.Thread(target=self._ponder, args=(snapshot, max_player, self._ponder_stop),
+                                               name='SearchWorker ponder', daemon=True)
+        self._ponder_thread.start()
+
+    def _ponder(self, board, max_player, stop):
+        replies = get_move_list(board, DARK_RED if max_player else WHITE)
+        # The last search stored the reply it expected as the best move of this position.
+        entry = self.tt.peek(position_hash(board, not max_player))
+        if entry is not None and entry[3] is not None:
+            replies = _best_first(replies, entry[3])
+
+        keys = []
+        children = {}
+        for reply in replies:
+            child = board.copy()
+            make_move(child, reply)
+            key = position_hash(child, max_player)
+            if key not in children and (self.book is None or self.book.lookup(child, max_player) is None):
+                keys.append(key)
+                children[key] = child
+
+        try:
+            # A quick look at every reply, then the likeliest first: the expected one, then the best for the opponent.
+            for key in keys:
+                self._deepen(key, children[key], max_player, stop)
+            best_for_opponent = sorted(keys[1:], key=lambda k: self._pondered[k][0], reverse=not max_player)
+            keys = keys[:1] + best_for_opponent
+            # Give each reply in turn the time a search would have, so that the AI answers any of them at once.
+            # Pondering then stops rather than keep a CPU busy for the rest of the opponent's turn.
+            for key in keys:
+                while True:
+                    left = self.time_budget_ms / 1000 - self._pondered[key][3]
+                    if left <= 0 or not self._deepen(key, children[key], max_player, stop,
+                                                     time.perf_counter() + left):
+                        break
+        except SearchTimeout:
+            pass
+
+    def _deepen(self, key, board, max_player, stop, deadline=None, max_depth=64):
+        """
+        Search a pondered reply one ply deeper than before, keeping its result and the time spent on it.
+        The time of an iteration cut short by the deadline is counted too, as its work stays in the table.
+        :return: False if the reply needs no deeper search.
+        """
+        value, move, completed, seconds = self._pondered.get(key, (None, None, 0, 0.0))
+        if completed >= max_depth or (completed and move is None):
+            return False
+        started = time.perf_counter()
+        try:
+            pv = principal_variation(board, max_player, self.tt, completed)
+            value, move = alphabeta(board, completed + 1, max_player, ordering=self.ordering, tt=self.tt, pv=pv,
+                                    deadline=deadline, stop=stop, evaluator=self.evaluator, tablebase=self.tablebase,
+                                    move_cache=self.move_cache)
+            completed += 1
+        except SearchTimeout:
+            if stop.is_set():
+                raise
+        finally:
+            self._pondered[key] = value, move, completed, seconds + time.perf_counter() - started
+        return True
+
+    def stop_pondering(self):
+        """Stop pondering, if running, and drop its results."""
+        if self._ponder_thread is not None:
+            self._ponder_stop.set()
+            self._ponder_thread.join()
+        self._ponder_thread = None
+        self._pondering = None
+        self._pondered = {}
@@ -0,0 +1,197 @@
+"""
+Play engine settings against each other in headless self-play games, spread over a process pool.
+
+    python -m tools.arena --games 200 --a depth=4 --b time=100,eval=weighted
+    python -m tools.arena --games 1000 --a depth=3 --b depth=3,eval=weighted --processes 16
+    python -m tools.arena --games 100 --record games.ckr
+    python -m tools.arena --games 10 --a time=200 --stats searches.jsonl
+
+An engine is written as comma-separated key=value pairs:
+    depth=N    search to a fixed depth with alphabeta (default 3)
+    time=MS    search with iterative deepening for MS milliseconds per move instead
+    eval=NAME  'material' (Board.evaluate, default) or 'weighted' (minimax.evaluation.Evaluator)
+    tt=MB      transposition table size (default 8)
+    tb=PATH    endgame tablebase built by tools.build_tablebase
+    book=PATH  opening book built by tools.build_book
+
+Engines swap colors every game and every game starts with a few random moves,
+so a pair of games shares its opening. Games that reach --max-plies are draws.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from checkers.bitboard import BitBoard
+from checkers.constants import WHITE, DARK_RED
+from checkers.record import GameWriter
+from minimax.algorithm import MoveOrdering, SearchStats, alphabeta, iterative_deepening, get_move_list, make_move
+from minimax.book import OpeningBook
+from minimax.tablebase import Tablebase
+from minimax.transposition import TranspositionTable
+
+EngineConfig = namedtuple('EngineConfig', ['depth', 'time_ms', 'evaluator', 'tt_mb', 'tablebase', 'book'])
+
+EVALUATORS = ('material', 'weighted')
+
+
+def parse_engine(spec):
+    """Parse an engine written as 'depth=4,time=100,eval=weighted,tt=8,tb=tablebase.ckt'."""
+    values = {'depth': 3, 'time': 0, 'eval': 'material', 'tt': 8, 'tb': None, 'book': None}
+    for item in filter(None, spec.split(',')):
+        key, _, value = item.partition('=')
+        if key not in values:
+            raise argparse.ArgumentTypeError('Unknown engine setting: {!r}'.format(key))
+        values[key] = value if key in ('eval', 'tb', 'book') else int(value)
+    if values['eval'] not in EVALUATORS:
+        raise argparse.ArgumentTypeError('Unknown evaluator: {!r}'.format(values['eval']))
+    return EngineConfig(values['depth'], values['time'], values['eval'], values['tt'], values['tb'], values['book'])
+
+
+class Engine:
+    """One side of a game, with its own transposition table and move ordering."""
+
+    def __init__(self, config):
+        self.config = config
+        self.ordering = MoveOrdering()
+        self.tt = TranspositionTable(config.tt_mb)
+        self.evaluator = None
+        if config.evaluator == 'weighted':
+            from minimax.evaluation import Evaluator
+            self.evaluator = Evaluator()
+        self.tablebase = Tablebase(config.tablebase) if config.tablebase else None
+        self.book = OpeningBook(config.book) if config.book else None
+
+    def choose(self, board, max_player, stats):
+        if self.book is not None:
+            found = self.book.lookup(board, max_player)
+            if found is not None:
+                return found[1]
+        if self.config.time_ms:
+            value, move, depth = iterative_deepening(board, max_player, self.config.time_ms, ordering=self.ordering,
+                                                     stats=stats, tt=self.tt, evaluator=self.evaluator,
+                                                     tablebase=self.tablebase)
+        else:
+            value, move = alphabeta(board, self.config.depth, max_player, ordering=self.ordering, stats=stats,
+                                    tt=self.tt, evaluator=self.evaluator, tablebase=self.tablebase)
+        return move
+
+
+def play_game(game_id, engine_a, engine_b, opening_plies, max_plies, seed, timed=False):
+    """
+    Play one game; engine_a has white in even games and red in odd ones.
+    :param timed: time the phases of every search and keep the stats of each one.
+    :return: a dict with the winner ('a', 'b' or None for a draw) and its color, the number of plies,
+        the moves, seconds and nodes spent by each engine, the Moves played
+        and, if timed, the SearchStats.as_dict of every search.
+    """
+    rng = random.Random(seed * 1000003 + game_id // 2)
+    engines = {WHITE: Engine(engine_a), DARK_RED: Engine(engine_b)}
+    names = {WHITE: 'a', DARK_RED: 'b'}
+    if game_id % 2:
+        engines = {WHITE: engines[DARK_RED], DARK_RED: engines[WHITE]}
+        names = {WHITE: 'b', DARK_RED: 'a'}
+    spent = {'a': [0, 0.0, 0], 'b': [0, 0.0, 0]}
+    searches = []
+
+    board = BitBoard()
+    turn = DARK_RED
+    winner = None
+    played = []
+    for ply in range(max_plies):
+        moves = get_move_list(board, turn)
+        other = WHITE if turn == DARK_RED else DARK_RED
+        if not moves:
+            # A side that cannot move has lost, as the search scores it.
+            winner = other
+            break
+        if ply < opening_plies:
+            move = rng.choice(moves)
+        else:
+            stats = SearchStats(timed)
+            start = time.perf_counter()
+            move = engines[turn].choose(board, turn == WHITE, stats)
+            record = spent[names[turn]]
+            record[0] += 1
+            record[1] += time.perf_counter() - start
+            record[2] += stats.nodes
+            if timed:
+                searches.append(dict(game=game_id, ply=ply, engine=names[turn], **stats.as_dict()))
+        played.append(move)
+        make_move(board, move)
+        if board.get_winner() is not None:
+            winner = board.get_winner()
+            break
+        turn = other
+
+    return {
+        'winner': names[winner] if winner is not None else None,
+        'color': winner,
+        'plies': len(played),
+        'moves': played,
+        'a': spent['a'],
+        'b': spent['b'],
+        'searches': searches,
+    }
+
+
+def _play(args):
+    return play_game(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--a', type=parse_engine, default=parse_engine(''), help='first engine')
+    parser.add_argument('--b', type=parse_engine, default=parse_engine(''), help='second engine')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--openings', type=int, default=4, help='random plies at the start of every game')
+    parser.add_argument('--max-plies', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--record', metavar='PATH', help='append the games to a binary game record')
+    parser.add_argument('--stats', metavar='PATH', help='write the stats of every search, phases timed, as JSON lines')
+    args = parser.parse_args()
+
+    tasks = [(game_id, args.a, args.b, args.openings, args.max_plies, args.seed, bool(args.stats))
+             for game_id in range(args.games)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.processes) as executor:
+        results = list(executor.map(_play, tasks, chunksize=max(1, args.games // (args.processes * 4))))
+    elapsed = time.perf_counter() - start
+
+    if args.record:
+        with GameWriter.open(args.record) as writer:
+            for result in results:
+                writer.begin_game()
+                for move in result['moves']:
+                    writer.write_move(move.start, move.end, move.skip)
+                writer.end_game(result['color'])
+
+    if args.stats:
+        with open(args.stats, 'w') as f:
+            for result in results:
+                for search in result['searches']:
+                    f.write(json.dumps(search) + '\n')
+
+    wins = sum(result['winner'] == 'a' for result in results)
+    losses = sum(result['winner'] == 'b' for result in results)
+    draws = len(results) - wins - losses
+    plies = sum(result['plies'] for result in results)
+    print('a: {}'.format(args.a))
+    print('b: {}'.format(args.b))
+    print('a won {}, drew {}, lost {} of {} games'.format(wins, draws, losses, len(results)))
+    for name in ('a', 'b'):
+        moves = sum(result[name][0] for result in results)
+        seconds = sum(result[name][1] for result in results)
+        nodes = sum(result[name][2] for result in results)
+        if moves:
+            print('{}: {:.1f} ms per move, {:.0f} nodes/s'.format(name, seconds / moves * 1000,
+                                                                 nodes / seconds if seconds else 0))
+    print('{} games, {} plies in {:.1f} s on {} processes: {:.2f} games/s, {:.0f} plies/s'.format(
+        len(results), plies, elapsed, args.processes, len(results) / elapsed, plies / elapsed))
+
+
+if __name__ == '__main__':
+    main()
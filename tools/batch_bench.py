@@ -0,0 +1,114 @@
+"""
+Play many random games side by side with checkers.batch.BoardBatch and measure the positions per second.
+
+    python -m tools.batch_bench --games 10000 --plies 100
+    python -m tools.batch_bench --games 500 --plies 60 --check
+
+Every ply generates the moves of all the games, picks one of each at random, plays them and looks for winners;
+finished games start over, so the batch stays full. For comparison, --scalar-games games are played
+the same way one position at a time, with BitBoard and get_move_list.
+With --check, the moves of every position, the positions after every move and the winners are compared
+with BitBoard and get_move_list at every ply.
+"""
+import argparse
+import random
+import time
+import numpy as np
+from checkers.batch import BoardBatch
+from checkers.bitboard import BitBoard, square_of
+from checkers.constants import WHITE, DARK_RED
+from minimax.algorithm import get_move_list, make_move
+
+
+def bench_batch(games, plies, seed, check):
+    """Play plies moves in games games at once; return the positions played and the seconds taken."""
+    rng = np.random.default_rng(seed)
+    batch = BoardBatch.start(games)
+    elapsed = 0.0
+    for _ in range(plies):
+        start = time.perf_counter()
+        moves = batch.get_moves()
+        choices = moves.random_choices(rng)
+        finished = (batch.get_winners() >= 0) | (choices < 0)
+        choices[finished] = -1
+        if check:
+            elapsed += time.perf_counter() - start
+            before = check_moves(batch, moves)
+            start = time.perf_counter()
+        batch.play(moves, choices)
+        if check:
+            elapsed += time.perf_counter() - start
+            check_play(batch, before, choices)
+            start = time.perf_counter()
+        batch.reset(finished)
+        elapsed += time.perf_counter() - start
+    return games * plies, elapsed
+
+
+def bench_scalar(games, plies, seed):
+    """Play the same way with one BitBoard per game; return the positions played and the seconds taken."""
+    rng = random.Random(seed)
+    boards = [(BitBoard(), DARK_RED) for _ in range(games)]
+    start = time.perf_counter()
+    for _ in range(plies):
+        for i, (board, turn) in enumerate(boards):
+            moves = get_move_list(board, turn)
+            if not moves or board.get_winner() is not None:
+                boards[i] = (BitBoard(), DARK_RED)
+                continue
+            make_move(board, rng.choice(moves))
+            boards[i] = (board, WHITE if turn == DARK_RED else DARK_RED)
+    return games * plies, time.perf_counter() - start
+
+
+def check_moves(batch, moves):
+    """Compare the moves and the winners of every position with BitBoard; return the BitBoards."""
+    boards = []
+    winners = batch.get_winners()
+    for i in range(len(batch)):
+        board, turn = batch.get_bitboard(i), int(batch.turn[i])
+        expected = [(square_of(*move.start), square_of(*move.end),
+                     sum(1 << square_of(piece.row, piece.col) for piece in move.skip or ()))
+                    for move in get_move_list(board, turn)]
+        found = slice(moves.offsets[i], moves.offsets[i + 1])
+        if list(zip(moves.start[found].tolist(), moves.end[found].tolist(),
+                    moves.captured[found].tolist())) != expected:
+            raise AssertionError('moves of {} differ from get_move_list'.format(i))
+        winner = board.get_winner()
+        if winners[i] != (-1 if winner is None else winner):
+            raise AssertionError('winner of {} differs from get_winner'.format(i))
+        boards.append((board, turn))
+    return boards
+
+
+def check_play(batch, before, choices):
+    """Compare every position after play with the same move made by make_move."""
+    for i, (board, turn) in enumerate(before):
+        if choices[i] < 0:
+            continue
+        make_move(board, get_move_list(board, turn)[choices[i]])
+        if (board.white, board.red) != (int(batch.white[i]), int(batch.red[i])) or batch.turn[i] == turn:
+            raise AssertionError('position {} differs from make_move'.format(i))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=10000, help='games played at once')
+    parser.add_argument('--plies', type=int, default=100)
+    parser.add_argument('--scalar-games', type=int, default=200, help='games played one at a time, 0 for none')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--check', action='store_true', help='check every ply against BitBoard')
+    args = parser.parse_args()
+
+    positions, elapsed = bench_batch(args.games, args.plies, args.seed, args.check)
+    rate = positions / elapsed
+    print('batch:  {} games x {} plies in {:.2f} s, {:.0f} positions/s{}'.format(
+        args.games, args.plies, elapsed, rate, ', checked' if args.check else ''))
+    if args.scalar_games:
+        positions, elapsed = bench_scalar(args.scalar_games, args.plies, args.seed)
+        print('scalar: {} games x {} plies in {:.2f} s, {:.0f} positions/s ({:.0f}x slower)'.format(
+            args.scalar_games, args.plies, elapsed, positions / elapsed, rate / (positions / elapsed)))
+
+
+if __name__ == '__main__':
+    main()
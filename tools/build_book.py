@@ -0,0 +1,39 @@
+"""
+Search every position near the start deeply and write the chosen moves to an opening book
+for minimax.book.OpeningBook.
+
+    python -m tools.build_book --plies 6 --depth 8 --output asset/opening.book
+
+The game and the arena play straight from the book while the position is in it.
+"""
+import argparse
+import time
+from minimax.book import build
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--plies', type=int, default=6, help='book every position reached in fewer plies')
+    parser.add_argument('--depth', type=int, default=8, help='search depth of every book position')
+    parser.add_argument('--eval', choices=('material', 'weighted'), default='material')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--output', default='asset/opening.book')
+    args = parser.parse_args()
+
+    evaluator = None
+    if args.eval == 'weighted':
+        from minimax.evaluation import Evaluator
+        evaluator = Evaluator()
+
+    start = time.perf_counter()
+
+    def progress(done, total):
+        if done % 100 == 0 or done == total:
+            print('{:>7.1f} s  {}/{} positions'.format(time.perf_counter() - start, done, total), flush=True)
+
+    count = build(args.output, args.plies, args.depth, args.processes, evaluator=evaluator, progress=progress)
+    print('{:>7.1f} s  wrote {} positions to {}'.format(time.perf_counter() - start, count, args.output))
+
+
+if __name__ == '__main__':
+    main()
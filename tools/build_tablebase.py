@@ -0,0 +1,30 @@
+"""
+Solve every endgame with up to N pieces and write a tablebase file for minimax.tablebase.Tablebase.
+
+    python -m tools.build_tablebase --pieces 4 --output tablebase.ckt
+
+Four pieces take about a minute and 2.4 MB; every extra piece multiplies both by roughly ten.
+"""
+import argparse
+import time
+from minimax.tablebase import generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pieces', type=int, default=4, help='maximum number of pieces on the board')
+    parser.add_argument('--output', default='tablebase.ckt')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def progress(white_count, red_count):
+        print('{:>7.1f} s  solving {} white vs {} red'.format(time.perf_counter() - start, white_count, red_count),
+              flush=True)
+
+    generate(args.output, args.pieces, progress)
+    print('{:>7.1f} s  wrote {}'.format(time.perf_counter() - start, args.output))
+
+
+if __name__ == '__main__':
+    main()
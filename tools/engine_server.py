@@ -0,0 +1,54 @@
+"""
+Serve best moves over a local TCP port to any number of concurrent games, see minimax.server for the protocol.
+
+    python -m tools.engine_server --port 8765 --processes 4 --book asset/opening.book
+
+Load it with tools.load_client.
+"""
+import argparse
+import asyncio
+from minimax.server import EngineServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--tt', type=int, default=64, help='shared transposition table size in MB')
+    parser.add_argument('--queue', type=int, default=256, help='waiting requests beyond which new ones are busy')
+    parser.add_argument('--batch', type=int, default=8, help='requests handed to a worker at once')
+    parser.add_argument('--book', metavar='PATH', help='opening book built by tools.build_book')
+    parser.add_argument('--tablebase', metavar='PATH', help='endgame tablebase built by tools.build_tablebase')
+    parser.add_argument('--eval', choices=('material', 'weighted'), default='material')
+    args = parser.parse_args()
+
+    book = tablebase = evaluator = None
+    if args.book:
+        from minimax.book import OpeningBook
+        book = OpeningBook(args.book)
+    if args.tablebase:
+        from minimax.tablebase import Tablebase
+        tablebase = Tablebase(args.tablebase)
+    if args.eval == 'weighted':
+        from minimax.evaluation import Evaluator
+        evaluator = Evaluator()
+
+    async def serve():
+        server = EngineServer(args.processes, args.tt, book, tablebase, evaluator, args.queue, args.batch)
+        await server.start(args.host, args.port)
+        print('Serving on {}:{} with {} processes'.format(args.host, server.port, server.processes), flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+            print(server.get_stats())
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
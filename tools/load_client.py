@@ -0,0 +1,157 @@
+"""
+Load an engine server with many concurrent games and report latency and throughput.
+
+    python -m tools.engine_server --port 8765 &
+    python -m tools.load_client --port 8765 --connections 32 --requests 2000 --depth 3
+
+    python -m tools.load_client --spawn --processes 4 --connections 32 --requests 2000 --time 20
+
+Every connection plays the part of one game: it sends a position, waits for the answer, and sends the next.
+Positions come from random games, so the server sees the spread of positions real games reach.
+With --spawn, a server is started in this process on a free local port instead of connecting to one.
+Before the load, malformed positions are sent on a connection of their own; each must get an error back.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from checkers.bitboard import BitBoard
+from checkers.constants import WHITE, DARK_RED
+from checkers.fen import to_fen
+from minimax.algorithm import get_move_list, make_move
+
+# Positions the server must refuse with an error: a square given twice, to both sides, and a side given twice.
+BAD_POSITIONS = [
+    'W:W1,1:B30',
+    'W:W1:B1',
+    'W:W1:W2',
+]
+
+
+def random_positions(count, seed, max_plies=40):
+    """Get count FEN strings of positions from random games."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board, turn = BitBoard(), DARK_RED
+        for _ in range(rng.randrange(max_plies)):
+            moves = get_move_list(board, turn)
+            if not moves or board.get_winner() is not None:
+                break
+            make_move(board, rng.choice(moves))
+            turn = WHITE if turn == DARK_RED else DARK_RED
+        if get_move_list(board, turn) and board.get_winner() is None:
+            positions.append(to_fen(board, turn))
+    return positions
+
+
+async def game(host, port, positions, budget, latencies, counts, deadline):
+    """Send requests one after another on one connection until positions or the time run out."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i, fen in enumerate(positions):
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            start = time.perf_counter()
+            writer.write(json.dumps(dict(budget, id=i, fen=fen)).encode() + b'\n')
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            if response.get('error') == 'busy':
+                counts['busy'] += 1
+                # Back off a little, as a well-behaved client of a saturated server would.
+                await asyncio.sleep(0.01)
+            elif 'error' in response:
+                counts['errors'] += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+                counts[response['source']] += 1
+    finally:
+        writer.close()
+
+
+async def check_errors(host, port, budget):
+    """Send the bad positions; return those not answered with an error."""
+    reader, writer = await asyncio.open_connection(host, port)
+    accepted = []
+    try:
+        for i, fen in enumerate(BAD_POSITIONS):
+            writer.write(json.dumps(dict(budget, id=i, fen=fen)).encode() + b'\n')
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            if response.get('id') != i or 'error' not in response or response['error'] == 'busy':
+                accepted.append(fen)
+    finally:
+        writer.close()
+    return accepted
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run(args):
+    server = None
+    host, port = args.host, args.port
+    if args.spawn:
+        from minimax.server import EngineServer
+        book = None
+        if args.book:
+            from minimax.book import OpeningBook
+            book = OpeningBook(args.book)
+        server = EngineServer(args.processes, book=book, queue_size=args.queue)
+        await server.start(host, 0)
+        port = server.port
+
+    budget = {'time_ms': args.time} if args.time else {'depth': args.depth}
+    positions = random_positions(args.requests, args.seed)
+    shares = [positions[i::args.connections] for i in range(args.connections)]
+    latencies = []
+    counts = {'book': 0, 'search': 0, 'busy': 0, 'errors': 0}
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    try:
+        accepted = await check_errors(host, port, budget)
+        start = time.perf_counter()
+        await asyncio.gather(*(game(host, port, share, budget, latencies, counts, deadline) for share in shares))
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            await server.close()
+
+    if accepted:
+        print('bad positions not refused: {}'.format(', '.join(accepted)))
+    else:
+        print('{} bad positions refused'.format(len(BAD_POSITIONS)))
+
+    print('{} connections, {}: {} answered ({} from the book), {} busy, {} errors in {:.1f} s'.format(
+        args.connections, budget, len(latencies), counts['book'], counts['busy'], counts['errors'], elapsed))
+    if latencies:
+        print('{:.1f} requests/s  p50 {:.1f} ms  p99 {:.1f} ms  max {:.1f} ms  mean {:.1f} ms'.format(
+            len(latencies) / elapsed, percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000,
+            max(latencies) * 1000, statistics.mean(latencies) * 1000))
+    if server is not None:
+        print('server: {}'.format(server.get_stats()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--connections', type=int, default=16, help='concurrent games')
+    parser.add_argument('--requests', type=int, default=1000, help='requests over all connections')
+    parser.add_argument('--duration', type=float, default=None, help='stop after this many seconds')
+    parser.add_argument('--depth', type=int, default=3, help='search depth of every request')
+    parser.add_argument('--time', type=int, default=0, help='search time of every request in ms, instead of depth')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn', action='store_true', help='start a server in this process')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes of the spawned server')
+    parser.add_argument('--queue', type=int, default=256, help='queue size of the spawned server')
+    parser.add_argument('--book', metavar='PATH', help='opening book of the spawned server')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
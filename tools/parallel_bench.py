@@ -0,0 +1,45 @@
+"""
+Measure how ParallelSearch scales with the number of worker processes.
+
+    python -m tools.parallel_bench --depth 7 --processes 1 2 4 8 16
+"""
+import argparse
+import os
+import time
+from checkers.bitboard import BitBoard
+from minimax.algorithm import SearchStats
+from minimax.parallel import ParallelSearch
+
+
+def bench(board, depth, processes):
+    """Time one search of board with a fresh pool of processes, excluding the pool start-up."""
+    with ParallelSearch(processes) as search:
+        # Start every worker before timing.
+        search.search(board, 1, True)
+        stats = SearchStats()
+        start = time.perf_counter()
+        value, move = search.search(board, depth, True, stats)
+        elapsed = time.perf_counter() - start
+    return value, move, stats.nodes, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--processes', type=int, nargs='+',
+                        default=[n for n in (1, 2, 4, 8, 16, 32) if n <= (os.cpu_count() or 1)])
+    args = parser.parse_args()
+
+    board = BitBoard()
+    baseline = None
+    print('{:>9} {:>10} {:>12} {:>10} {:>8}'.format('processes', 'seconds', 'nodes', 'nodes/s', 'speedup'))
+    for processes in args.processes:
+        value, move, nodes, elapsed = bench(board, args.depth, processes)
+        if baseline is None:
+            baseline = elapsed
+        print('{:>9} {:>10.3f} {:>12} {:>10.0f} {:>8.2f}'.format(processes, elapsed, nodes, nodes / elapsed,
+                                                                 baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
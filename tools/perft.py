@@ -0,0 +1,95 @@
+"""
+Count the leaf nodes of the move tree to a fixed depth (perft) to benchmark and check move generation.
+
+    python -m tools.perft                         # check every position on every backend
+    python -m tools.perft --backend bitboard --depth 7
+    python -m tools.perft --fen 'W:W21:B1,10,11,12,15,17,18,19,30' --depth 4
+
+The counts follow this game's rules (every piece moves and jumps in all four directions,
+capturing is optional and every landing square of a chain is a move of its own),
+so they differ from published perft numbers for standard checkers.
+"""
+import argparse
+import sys
+import time
+from checkers.board import Board
+from checkers.bitboard import BitBoard
+from checkers.constants import WHITE, DARK_RED
+from checkers.fen import START_FEN, parse_fen
+from minimax.algorithm import get_move_list, make_move, unmake_move
+
+BACKENDS = {
+    'board': Board,
+    'bitboard': BitBoard,
+}
+
+# FEN -> known leaf counts at depth 1, 2, 3, ...
+POSITIONS = {
+    # The starting position of Board.create_board.
+    START_FEN: [7, 49, 428, 3709, 36742, 361091],
+    # Long chains, where a jumped piece must not be jumped again on the way back.
+    'W:W3,7,9,24:B11,17,18,19,20,25,26,27,32': [19, 411, 5697, 110868],
+    # Branching chains, where one branch's jumps must not leak into its siblings.
+    'W:W5:B1,7,9,10,13,17,19,25,26,27': [6, 118, 449, 8234],
+    'W:W21:B1,10,11,12,15,17,18,19,30': [5, 74, 262, 3984],
+    # Chains that reach the same square by different paths.
+    'W:W8,19,24:B5,7,9,10,11,17,25,26,29': [14, 286, 2961, 56742],
+    'W:W2,5,7:B9,11,15,16,17,19,25,26,27': [9, 182, 1484, 30382],
+}
+
+
+def perft(board, color, depth):
+    """Count the positions reached after exactly depth moves, with color to move."""
+    moves = get_move_list(board, color)
+    if depth == 1:
+        return len(moves)
+    other = DARK_RED if color == WHITE else WHITE
+    nodes = 0
+    for move in moves:
+        make_move(board, move)
+        nodes += perft(board, other, depth - 1)
+        unmake_move(board, move)
+    return nodes
+
+
+def run(backend, fen, depth):
+    """Run perft on a position and return its leaf count and the nodes per second."""
+    turn = parse_fen(fen)[0]
+    board = BACKENDS[backend].from_fen(fen)
+    start = time.perf_counter()
+    nodes = perft(board, turn, depth) if depth > 0 else 1
+    elapsed = time.perf_counter() - start
+    return nodes, nodes / elapsed if elapsed > 0 else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=sorted(BACKENDS), action='append',
+                        help='board backend to run, can be repeated (default: all)')
+    parser.add_argument('--fen', help='position to run instead of the built-in ones')
+    parser.add_argument('--depth', type=int, help='maximum depth (default: every depth with a known count)')
+    args = parser.parse_args()
+
+    backends = args.backend or sorted(BACKENDS)
+    positions = {args.fen: POSITIONS.get(args.fen, [])} if args.fen else POSITIONS
+    failures = 0
+    for fen, known in positions.items():
+        print(fen)
+        max_depth = args.depth or len(known)
+        for backend in backends:
+            for depth in range(1, max_depth + 1):
+                nodes, speed = run(backend, fen, depth)
+                if depth <= len(known):
+                    status = 'ok' if nodes == known[depth - 1] else 'FAIL (expected {})'.format(known[depth - 1])
+                    failures += status != 'ok'
+                else:
+                    status = ''
+                print('  {:<9} depth {:>2} {:>12} nodes {:>12.0f} nodes/s  {}'.format(backend, depth, nodes, speed,
+                                                                                   status))
+    if failures:
+        print('{} count(s) did not match'.format(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
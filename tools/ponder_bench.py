@@ -0,0 +1,80 @@
+"""
+Measure how long the AI makes a player wait for its reply, with and without pondering.
+
+    python -m tools.ponder_bench --time 500 --think 5000 --moves 10
+
+The player is simulated: it thinks for --think milliseconds, then plays the move of a --player-depth search.
+Meanwhile, with pondering on, the AI searches the player's replies as Checker does in the game.
+"""
+import argparse
+import statistics
+import time
+from checkers.bitboard import BitBoard
+from minimax.algorithm import MoveOrdering, alphabeta, make_move
+from minimax.transposition import TranspositionTable
+from minimax.worker import SearchWorker
+
+
+def play(ponder, time_ms, think_ms, player_depth, moves, tt_mb):
+    """
+    Play a game of moves moves per side, the AI white.
+    :return: the seconds the player waited for each AI move, the depth of each, and how many started from pondering.
+    """
+    worker = SearchWorker(time_ms, MoveOrdering(), TranspositionTable(tt_mb))
+    board = BitBoard()
+    waits, depths = [], []
+    hits = 0
+    try:
+        for _ in range(moves):
+            # The player's turn.
+            if ponder:
+                worker.ponder(board, True)
+            time.sleep(think_ms / 1000)
+            value, move = alphabeta(board, player_depth, False, ordering=MoveOrdering())
+            if move is None:
+                break
+            make_move(board, move)
+            if board.get_winner() is not None:
+                break
+
+            # The AI's turn.
+            start = time.perf_counter()
+            worker.start(board, True)
+            hits += worker.ponder_hit
+            result = None
+            while result is None:
+                time.sleep(0.001)
+                result = worker.poll()
+            waits.append(time.perf_counter() - start)
+            value, move, depth = result
+            depths.append(depth)
+            if move is None:
+                break
+            make_move(board, move)
+            if board.get_winner() is not None:
+                break
+    finally:
+        worker.cancel()
+    return waits, depths, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--time', type=int, default=500, help='AI time budget per move, in milliseconds')
+    parser.add_argument('--think', type=int, default=5000, help='player thinking time per move, in milliseconds')
+    parser.add_argument('--player-depth', type=int, default=4, help='search depth of the simulated player')
+    parser.add_argument('--moves', type=int, default=10)
+    parser.add_argument('--tt', type=int, default=32, help='transposition table size in MB')
+    args = parser.parse_args()
+
+    print('{:>8} {:>12} {:>12} {:>12} {:>10} {:>6}'.format('ponder', 'mean wait ms', 'median ms', 'max ms',
+                                                            'mean depth', 'hits'))
+    for ponder in (False, True):
+        waits, depths, hits = play(ponder, args.time, args.think, args.player_depth, args.moves, args.tt)
+        print('{:>8} {:>12.0f} {:>12.0f} {:>12.0f} {:>10.1f} {:>6}'.format(
+            'on' if ponder else 'off', statistics.mean(waits) * 1000, statistics.median(waits) * 1000,
+            max(waits) * 1000, statistics.mean(depths), '{}/{}'.format(hits, len(waits))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Profile a search engine over a fixed set of benchmark positions.
+
+    python -m tools.profile_search                              # alphabeta on BitBoard, the game's engine
+    python -m tools.profile_search --engine minimax --backend board --depth 3
+    python -m tools.profile_search --collapsed search.folded    # then: flamegraph.pl search.folded > search.svg
+
+    python -m tools.profile_search --save before.prof
+    ... change the engine ...
+    python -m tools.profile_search --compare before.prof        # profile again and compare with before
+    python -m tools.profile_search --load after.prof --compare before.prof
+
+    python -m tools.profile_search --check                      # alphabeta against minimax_move, no profile
+
+The per-function timings come from cProfile: calls, the time spent in each function itself (own)
+and including what it calls (cumulative). Every position is searched to a fixed depth
+with a fresh transposition table and move ordering, so the same engine visits the same tree every run.
+Profiles are compared by file and function name, so they still line up after the code moves around.
+--collapsed profiles the positions once more with minimax.profiling.StackProfiler
+and writes its stacks for flame graph tools.
+--check compares the value and the best move of alphabeta, with every combination of move ordering,
+transposition table and move cache, with those of minimax_move, on the benchmark positions and on positions
+from random games, at every depth up to --depth: the pruning and the ordering must never change the answer.
+"""
+import argparse
+import cProfile
+import os
+import pstats
+import random
+import re
+import sys
+import time
+from checkers.board import Board
+from checkers.bitboard import BitBoard
+from checkers.constants import WHITE, DARK_RED
+from checkers.fen import START_FEN, parse_fen, to_fen
+from minimax.algorithm import MoveOrdering, alphabeta, minimax, minimax_move, get_move_list, make_move
+from minimax.movecache import MoveCache
+from minimax.profiling import StackProfiler
+from minimax.transposition import TranspositionTable
+
+BACKENDS = {
+    'board': Board,
+    'bitboard': BitBoard,
+}
+
+# name -> (search(board, depth, max_player), default depth)
+ENGINES = {
+    # The original search, on a copy of the board for every move.
+    'minimax': (lambda board, depth, max_player: minimax(board, depth, max_player, None), 3),
+    'minimax_move': (lambda board, depth, max_player: minimax_move(board, depth, max_player), 4),
+    'alphabeta': (lambda board, depth, max_player: alphabeta(board, depth, max_player, ordering=MoveOrdering(),
+                                                             tt=TranspositionTable(16)), 5),
+}
+
+# The benchmark positions: the start, openings and middle games from random games, and a position full of chains.
+# Keep them fixed, so that profiles taken before and after a change search the same trees.
+POSITIONS = [
+    START_FEN,
+    'B:W1,2,3,4,5,6,7,8,9,10,16:B14,22,23,24,26,27,28,29,30,31,32',
+    'B:W1,3,4,5,6,7,8,10,11,13,15,19:B17,18,21,22,23,24,27,28,29,30,31,32',
+    'B:W1,2,3,4,5,6,7,8,9,10,15,24:B11,14,18,21,22,25,26,27,28,29,30,32',
+    'B:W1,2,3,4,5,8,12,13,23:B11,14,22,24,25,26,29,30,31,32',
+    'B:W2,3,5,8,9,12,13,16,17,19:B21,25,27,28,29,30,31,32',
+    'W:W8,19,24:B5,7,9,10,11,17,25,26,29',
+]
+
+# The alphabeta configurations checked by --check: name -> keyword arguments, built afresh for every search.
+CHECKED = {
+    'plain': lambda: {},
+    'ordering': lambda: dict(ordering=MoveOrdering()),
+    'tt': lambda: dict(tt=TranspositionTable(4)),
+    'ordering+tt': lambda: dict(ordering=MoveOrdering(), tt=TranspositionTable(4)),
+    'ordering+tt+cache': lambda: dict(ordering=MoveOrdering(), tt=TranspositionTable(4), move_cache=MoveCache()),
+}
+
+
+def search_all(engine, backend, depth):
+    """Search every benchmark position with an engine; return the seconds taken."""
+    search = ENGINES[engine][0]
+    start = time.perf_counter()
+    for fen in POSITIONS:
+        search(BACKENDS[backend].from_fen(fen), depth, parse_fen(fen)[0] == WHITE)
+    return time.perf_counter() - start
+
+
+def random_positions(count, seed, max_plies=40):
+    """Get count FEN strings of positions from random games that are not over."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board, turn = BitBoard(), DARK_RED
+        for _ in range(rng.randrange(max_plies)):
+            moves = get_move_list(board, turn)
+            if not moves or board.get_winner() is not None:
+                break
+            make_move(board, rng.choice(moves))
+            turn = WHITE if turn == DARK_RED else DARK_RED
+        if get_move_list(board, turn) and board.get_winner() is None:
+            positions.append(to_fen(board, turn))
+    return positions
+
+
+def check_alphabeta(backend, depth, count, seed):
+    """Compare alphabeta with minimax_move at every depth up to depth; return the searches checked and failed."""
+    checked = failures = 0
+    for fen in POSITIONS + random_positions(count, seed):
+        board, max_player = BACKENDS[backend].from_fen(fen), parse_fen(fen)[0] == WHITE
+        for d in range(1, depth + 1):
+            value, move = minimax_move(board, d, max_player)
+            expected = value, move and (move.start, move.end)
+            for name, config in CHECKED.items():
+                value, move = alphabeta(board, d, max_player, **config())
+                found = value, move and (move.start, move.end)
+                checked += 1
+                if found != expected:
+                    failures += 1
+                    print('FAIL {} depth {} {}: {} instead of {}'.format(fen, d, name, found, expected))
+    return checked, failures
+
+
+def function_times(stats):
+    """Get 'directory/file.py:function' -> [calls, own seconds, cumulative seconds] of a pstats.Stats."""
+    times = {}
+    for (filename, line, name), (primitive_calls, calls, own, cumulative, callers) in stats.stats.items():
+        if filename != '~':
+            filename = os.path.join(os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+        else:
+            # Built-ins are named after their object, address included: '<built-in method __new__ of type object
+            # at 0x7f39...>'. The address changes from run to run.
+            name = re.sub(r' at 0x[0-9a-fA-F]+', '', name)
+        entry = times.setdefault('{}:{}'.format(filename, name), [0, 0.0, 0.0])
+        entry[0] += calls
+        entry[1] += own
+        entry[2] += cumulative
+    return times
+
+
+def print_functions(stats, top):
+    times = function_times(stats)
+    total = sum(own for calls, own, cumulative in times.values())
+    print('{:>10} {:>10} {:>6} {:>10}  function  ({:.0f} ms in all)'.format('calls', 'own ms', 'own', 'cum ms',
+                                                                           total * 1000))
+    for name, (calls, own, cumulative) in sorted(times.items(), key=lambda item: -item[1][1])[:top]:
+        print('{:>10} {:>10.1f} {:>5.1f}% {:>10.1f}  {}'.format(calls, own * 1000, 100 * own / total,
+                                                                 cumulative * 1000, name))
+
+
+def print_comparison(before, after, top):
+    """Print the functions whose own time changed the most between two pstats.Stats."""
+    before, after = function_times(before), function_times(after)
+    empty = [0, 0.0, 0.0]
+    total_before = sum(own for calls, own, cumulative in before.values())
+    total_after = sum(own for calls, own, cumulative in after.values())
+    print('total {:.0f} ms -> {:.0f} ms ({:+.1f}%)'.format(total_before * 1000, total_after * 1000,
+                                                          100 * (total_after / total_before - 1)))
+    print('{:>10} {:>10} {:>10} {:>10} {:>10}  function'.format('calls', 'calls', 'own ms', 'own ms', 'change'))
+    names = sorted(set(before) | set(after),
+                   key=lambda name: -abs(after.get(name, empty)[1] - before.get(name, empty)[1]))
+    for name in names[:top]:
+        calls_before, own_before, _ = before.get(name, empty)
+        calls_after, own_after, _ = after.get(name, empty)
+        change = '{:+.1f}%'.format(100 * (own_after / own_before - 1)) if own_before else 'new'
+        print('{:>10} {:>10} {:>10.1f} {:>10.1f} {:>10}  {}'.format(calls_before, calls_after, own_before * 1000,
+                                                                   own_after * 1000, change, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='alphabeta')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='bitboard')
+    parser.add_argument('--depth', type=int, default=None, help='search depth, by default the engine\'s own')
+    parser.add_argument('--top', type=int, default=25, help='functions to print')
+    parser.add_argument('--save', metavar='PATH', help='save the profile, to compare it with a later one')
+    parser.add_argument('--load', metavar='PATH', help='print a saved profile instead of running one')
+    parser.add_argument('--compare', metavar='PATH', help='compare the profile with one saved before')
+    parser.add_argument('--collapsed', metavar='PATH', help='write the stacks of the search in collapsed format')
+    parser.add_argument('--check', action='store_true', help='check alphabeta against minimax_move instead')
+    parser.add_argument('--positions', type=int, default=50, help='random positions checked by --check')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if args.check:
+        depth = args.depth or 4
+        start = time.perf_counter()
+        checked, failures = check_alphabeta(args.backend, depth, args.positions, args.seed)
+        print('{} searches up to depth {} on {} checked against minimax_move in {:.1f} s: {} failed'.format(
+            checked, depth, args.backend, time.perf_counter() - start, failures))
+        if failures:
+            sys.exit(1)
+        return
+    if args.load and args.collapsed:
+        parser.error('--collapsed needs a run, not --load')
+    depth = args.depth or ENGINES[args.engine][1]
+
+    if args.load:
+        stats = pstats.Stats(args.load)
+    else:
+        profile = cProfile.Profile()
+        profile.enable()
+        elapsed = search_all(args.engine, args.backend, depth)
+        profile.disable()
+        print('{} on {}, depth {}: {} positions in {:.2f} s under cProfile'.format(
+            args.engine, args.backend, depth, len(POSITIONS), elapsed))
+        stats = pstats.Stats(profile)
+        if args.save:
+            stats.dump_stats(args.save)
+
+    if args.compare:
+        print_comparison(pstats.Stats(args.compare), stats, args.top)
+    else:
+        print_functions(stats, args.top)
+
+    if args.collapsed:
+        with StackProfiler() as profiler:
+            search_all(args.engine, args.backend, depth)
+        with open(args.collapsed, 'w') as f:
+            profiler.write_collapsed(f)
+        print('{} stacks, {:.2f} s, written to {}'.format(len(profiler.stacks), profiler.total(), args.collapsed))
+
+
+if __name__ == '__main__':
+    main()
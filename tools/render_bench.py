@@ -0,0 +1,102 @@
+"""
+Compare the full redraw of the board with dirty-rectangle rendering, headless.
+
+    python -m tools.render_bench --moves 40 --idle 60
+
+Plays random moves through Game, with the valid-move dots of each move shown for a few frames,
+and --idle frames without any change after every move, as at 60 FPS while a player thinks.
+With --check, every dirty-rectangle frame is also compared pixel by pixel with a full redraw.
+"""
+import argparse
+import os
+import random
+import time
+
+# Draw into memory; this must be set before pygame opens a display.
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from checkers.constants import WIDTH, HEIGHT
+from checkers.game import Game
+from checkers.render import draw_board, draw_dot
+from minimax.algorithm import get_move_list
+
+
+def bench(dirty_rects, moves, idle, seed, check):
+    """
+    Play the same random game and time every Game.update.
+    :return: (seconds of the frames with a change, their count, seconds of the idle frames, their count,
+        pixels passed to display.update).
+    """
+    win = pygame.display.get_surface()
+    game = Game(win, dirty_rects=dirty_rects)
+    rng = random.Random(seed)
+    updated = [0]
+    display_update = pygame.display.update
+
+    def counting_update(rects=None):
+        if rects is None:
+            updated[0] += WIDTH * HEIGHT
+        else:
+            updated[0] += sum(rect.width * rect.height for rect in rects)
+        display_update(rects)
+
+    pygame.display.update = counting_update
+    busy = busy_frames = quiet = quiet_frames = 0.0
+    reference = pygame.Surface((WIDTH, HEIGHT))
+    try:
+        def frame():
+            start = time.perf_counter()
+            game.update()
+            elapsed = time.perf_counter() - start
+            if check:
+                draw_board(reference, game.board)
+                for row, col in game.valid_moves:
+                    draw_dot(reference, row, col)
+                if pygame.image.tostring(reference, 'RGB') != pygame.image.tostring(win, 'RGB'):
+                    raise AssertionError('dirty-rectangle frame differs from a full redraw')
+            return elapsed
+
+        for _ in range(moves):
+            legal = get_move_list(game.board, game.turn)
+            if not legal or game.get_winner() is not None:
+                break
+            move = rng.choice(legal)
+            # Show the dots of the selected piece, then play the move.
+            game.select(*move.start)
+            busy += frame()
+            busy_frames += 1
+            game.select(*move.end)
+            busy += frame()
+            busy_frames += 1
+            for _ in range(idle):
+                quiet += frame()
+                quiet_frames += 1
+    finally:
+        pygame.display.update = display_update
+    return busy, busy_frames, quiet, quiet_frames, updated[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--moves', type=int, default=40)
+    parser.add_argument('--idle', type=int, default=60, help='frames without change after every move')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--check', action='store_true', help='compare every frame with a full redraw')
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    print('{:>6} {:>14} {:>14} {:>14} {:>16}'.format('mode', 'ms/move frame', 'ms/idle frame', 'ms total',
+                                                     'pixels updated'))
+    for name, dirty_rects in (('full', False), ('dirty', True)):
+        busy, busy_frames, quiet, quiet_frames, pixels = bench(dirty_rects, args.moves, args.idle, args.seed,
+                                                               args.check and dirty_rects)
+        print('{:>6} {:>14.3f} {:>14.3f} {:>14.1f} {:>16}'.format(
+            name, busy / busy_frames * 1000 if busy_frames else 0, quiet / quiet_frames * 1000 if quiet_frames else 0,
+            (busy + quiet) * 1000, pixels))
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
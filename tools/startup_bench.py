@@ -0,0 +1,76 @@
+"""
+Time the cold start of the game to its first frame, headless.
+
+    python -m tools.startup_bench --runs 10
+
+Every run starts a fresh interpreter that imports main, builds a Checker and draws the start screen,
+so the time covers the interpreter, the imports, pygame and the assets, as a launch does.
+The first run starts without the image cache, as the first launch after an install, unless --keep-cache;
+the others read it back. Also timed is the first frame of the board after clicking Play,
+which pays for the game and the AI created then.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the child, from the root of the repository.
+LAUNCH = '''
+import time
+from main import Checker
+checker = Checker()
+checker._start_new_game()
+print('frame', flush=True)
+start = time.perf_counter()
+checker._check_button(checker.play_button.rect.center)
+checker.game.update()
+print('board', time.perf_counter() - start, flush=True)
+checker._quit()
+'''
+
+
+def launch():
+    """Start the game in a new interpreter; return the seconds to its first frame and to the board after Play."""
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', LAUNCH], cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    first_frame = board = None
+    for line in process.stdout:
+        if line.startswith('frame'):
+            first_frame = time.perf_counter() - start
+        elif line.startswith('board'):
+            board = float(line.split()[1])
+    if process.wait() != 0 or first_frame is None:
+        raise RuntimeError('the game failed to start')
+    return first_frame, board
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='launches with the image cache in place')
+    parser.add_argument('--keep-cache', action='store_true', help='do not empty the image cache before the first run')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    from main import CACHE_DIR
+    if not args.keep_cache:
+        shutil.rmtree(os.path.join(ROOT, CACHE_DIR), ignore_errors=True)
+    first_frame, board = launch()
+    print('first launch: first frame {:.1f} ms  board after Play {:.1f} ms'.format(first_frame * 1000, board * 1000))
+
+    runs = [launch() for _ in range(args.runs)]
+    frames = [first_frame for first_frame, board in runs]
+    boards = [board for first_frame, board in runs]
+    print('{} launches: first frame median {:.1f} ms  min {:.1f} ms  max {:.1f} ms  board after Play median {:.1f} ms'
+          .format(args.runs, statistics.median(frames) * 1000, min(frames) * 1000, max(frames) * 1000,
+                  statistics.median(boards) * 1000))
+
+
+if __name__ == '__main__':
+    main()